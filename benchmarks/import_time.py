@@ -0,0 +1,65 @@
+"""
+cold-start budget of the pandora cli.
+
+    python benchmarks/import_time.py --max_import_ms 150 --max_help_ms 400
+
+exits with a non zero status when `import pandora` or `pandora --help` exceed their budget
+or when a heavy dependency is imported eagerly.
+"""
+import re
+import subprocess
+import sys
+import time
+from statistics import median
+
+import click
+
+HEAVY_MODULES = ["openai", "httpx", "mcp", "zmq", "pydantic", "google.genai", "rich", "textual", "numpy"]
+
+def run(code:str, *flags:str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True, check=True)
+
+def wall_time_ms(code:str, repeat:int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(code)
+        durations.append((time.perf_counter() - start) * 1000)
+    return median(durations)
+
+def cumulative_import_ms(module:str) -> float:
+    # -X importtime writes "import time: self [us] | cumulative | imported package" lines on stderr
+    stderr = run(f"import {module}", "-X", "importtime").stderr
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)$", line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+@click.command()
+@click.option("--repeat", type=int, default=10)
+@click.option("--max_import_ms", type=float, default=150.0)
+@click.option("--max_help_ms", type=float, default=400.0)
+def main(repeat:int, max_import_ms:float, max_help_ms:float) -> None:
+    baseline_ms = wall_time_ms("pass", repeat)
+    import_ms = cumulative_import_ms("pandora")
+    help_ms = wall_time_ms("import sys; from pandora import main; sys.argv = ['pandora', '--help']; main()", repeat) - baseline_ms
+    loaded = run(f"import sys, pandora; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))").stdout.split()
+
+    print(f"interpreter startup : {baseline_ms:8.1f} ms")
+    print(f"import pandora      : {import_ms:8.1f} ms (budget {max_import_ms} ms)")
+    print(f"pandora --help      : {help_ms:8.1f} ms (budget {max_help_ms} ms, interpreter startup excluded)")
+    print(f"eager heavy imports : {loaded or 'none'}")
+
+    failures = []
+    if import_ms > max_import_ms:
+        failures.append("import pandora is over budget")
+    if help_ms > max_help_ms:
+        failures.append("pandora --help is over budget")
+    if loaded:
+        failures.append(f"heavy modules imported by `import pandora`: {loaded}")
+    if failures:
+        raise click.ClickException(", ".join(failures))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+mcp tool responses carrying large base64 blocks over zmq inproc, from the worker's
+json encoding to the string handed to the engine : copied frames vs copy=False.
+
+    python benchmarks/mcp_transport.py --size-mb 1 --size-mb 8 --size-mb 32
+"""
+import asyncio
+import base64
+import json
+import os
+import time
+from statistics import median
+from typing import Any, Dict, List
+
+import click
+import zmq
+import zmq.asyncio
+
+def build_response(size:int) -> Dict[str, Any]:
+    # what the worker builds from ImageContent.model_dump() / EmbeddedResource.model_dump()
+    return {
+        "status": "success",
+        "content_blocks": [
+            {"type": "text", "text": "screenshot captured", "annotations": None},
+            {"type": "image", "data": base64.b64encode(os.urandom(size)).decode(), "mimeType": "image/png", "annotations": None},
+        ]
+    }
+
+async def roundtrip(response:Dict[str, Any], repeat:int, copy:bool) -> List[float]:
+    ctx = zmq.asyncio.Context()
+    router_socket = ctx.socket(zmq.ROUTER)
+    router_socket.bind("inproc://mcp_server_benchmark")
+    dealer_socket = ctx.socket(zmq.DEALER)
+    dealer_socket.connect("inproc://mcp_server_benchmark")
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await dealer_socket.send_multipart([b"", b"screenshot", b"{}"])
+        client_socket_id, _, _, _ = await router_socket.recv_multipart()
+        await router_socket.send_multipart([client_socket_id, b"", json.dumps(response).encode()], copy=copy)
+        _, frame = await dealer_socket.recv_multipart(copy=copy)
+        result = frame.decode() if copy else str(frame.buffer, "utf-8")
+        durations.append(time.perf_counter() - start)
+        del result
+
+    dealer_socket.close(linger=0)
+    router_socket.close(linger=0)
+    ctx.term()
+    return durations
+
+@click.command()
+@click.option("--size-mb", "sizes", type=int, multiple=True, default=[1, 8, 32])
+@click.option("--repeat", type=int, default=10)
+def main(sizes:List[int], repeat:int) -> None:
+    for size_mb in sizes:
+        response = build_response(size_mb * 1024 ** 2)
+        payload_mb = len(json.dumps(response)) / 1024 ** 2
+        copied_s = median(asyncio.run(roundtrip(response, repeat, copy=True)))
+        zero_copy_s = median(asyncio.run(roundtrip(response, repeat, copy=False)))
+        print(f"payload={payload_mb:.1f} MB (base64)")
+        print(f"   copied frames   : {copied_s * 1000:9.2f} ms {payload_mb / copied_s:9.1f} MB/s")
+        print(f"   copy=False      : {zero_copy_s * 1000:9.2f} ms {payload_mb / zero_copy_s:9.1f} MB/s ({copied_s / zero_copy_s:.2f}x)")
+
+if __name__ == "__main__":
+    main()
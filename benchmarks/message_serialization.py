@@ -0,0 +1,100 @@
+"""
+per-turn client side cost of a streamed request and memory of the history.
+before: the baseline passed the pydantic ChatMessage list to the sdk, which transforms and encodes it every turn.
+after: the history lives in a MessageStore and the request body is the concatenation of its cached fragments.
+requests go to an in-process mock transport, so only the client side is measured.
+
+    python benchmarks/message_serialization.py --history 1000 --history 5000
+"""
+import asyncio
+import json
+import logging
+import time
+import tracemalloc
+from statistics import median
+from typing import Awaitable, Callable, List
+
+import click
+import httpx
+from openai import AsyncOpenAI
+
+from pandora.client_manager import ClientManager
+from pandora.types import ChatMessage, Role
+from pandora.message_store import MessageStore, StoredMessage
+
+SSE_BODY = b"data: [DONE]\n\n"
+
+def build_history(size:int) -> List[ChatMessage]:
+    messages = []
+    for index in range(size):
+        match index % 3:
+            case 0:
+                messages.append(ChatMessage(role=Role.USER, content=f"query {index} " + "lorem ipsum " * 40))
+            case 1:
+                messages.append(ChatMessage(role=Role.ASSISTANT, tool_calls=[{
+                    "id": f"call_{index}", "type": "function",
+                    "function": {"name": "read_file", "arguments": json.dumps({"file_path": f"src/module_{index}.py"})}
+                }]))
+            case 2:
+                messages.append(ChatMessage(role=Role.TOOL, tool_call_id=f"call_{index - 1}", content="def f():\n    return 1\n" * 30))
+    return messages
+
+async def timeit(function:Callable[[], Awaitable[object]], repeat:int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return median(durations)
+
+def allocated_bytes(function:Callable[[], object]) -> int:
+    tracemalloc.start()
+    retained = function()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return current
+
+async def run(history:List[int], repeat:int) -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per mocked request otherwise
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=SSE_BODY, headers={"content-type": "text/event-stream"})))
+    openai_client = AsyncOpenAI(api_key="sk-benchmark", http_client=http_client, max_retries=0)
+    client_manager = ClientManager("sk-benchmark", requests_per_minute=10**9, tokens_per_minute=10**12)
+    client_manager.http_client, client_manager.openai_client = http_client, openai_client
+    system = StoredMessage(role=Role.SYSTEM, content="system")
+    params = {"model": "gpt-4.1", "stream": True, "max_tokens": 8192}
+
+    for size in history:
+        messages = build_history(size)
+        store = MessageStore(messages)
+
+        async def baseline_turn():
+            # the baseline engine: pydantic models handed to the sdk
+            stream = await openai_client.chat.completions.create(messages=[ChatMessage(role=Role.SYSTEM, content="system"), *messages], **params)
+            async for _ in stream:
+                pass
+
+        async def store_turn():
+            stream = await client_manager.create(encoded_messages=store.encode(system), estimated_prompt_size=store.size, **params)
+            async for _ in stream:
+                pass
+
+        baseline_ms = await timeit(baseline_turn, repeat)
+        store_ms = await timeit(store_turn, repeat)
+        baseline_memory = allocated_bytes(lambda: build_history(size)) / size
+        store_memory = allocated_bytes(lambda: MessageStore(build_history(size))) / size
+
+        print(f"history={size}")
+        print(f"   per turn, ChatMessage list through the sdk : {baseline_ms:8.3f} ms")
+        print(f"   per turn, MessageStore fragments          : {store_ms:8.3f} ms ({baseline_ms / max(store_ms, 1e-6):.1f}x)")
+        print(f"   memory per message                        : {baseline_memory:8.0f} B (ChatMessage) / {store_memory:8.0f} B (StoredMessage)")
+    await http_client.aclose()
+
+@click.command()
+@click.option("--history", type=int, multiple=True, default=[1000, 5000])
+@click.option("--repeat", type=int, default=20)
+def main(history:List[int], repeat:int) -> None:
+    asyncio.run(run(history, repeat))
+
+if __name__ == "__main__":
+    main()
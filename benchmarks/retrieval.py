@@ -0,0 +1,46 @@
+"""
+build, incremental refresh and query latency of the workspace index.
+
+    python benchmarks/retrieval.py --workspace_dir . --query "rate limiter" --query "session fork"
+"""
+import tempfile
+import time
+from statistics import median
+from typing import List
+
+import click
+
+from pandora.workspace_index import WorkspaceIndex, render_snippets
+
+@click.command()
+@click.option("--workspace_dir", type=click.Path(exists=True, file_okay=False), default=".")
+@click.option("--query", "queries", type=str, multiple=True, default=["token bucket rate limiter", "fork a session from a checkpoint"])
+@click.option("--top_k", type=int, default=5)
+@click.option("--repeat", type=int, default=20)
+def main(workspace_dir:str, queries:List[str], top_k:int, repeat:int) -> None:
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = WorkspaceIndex(workspace_dir=workspace_dir, index_dir=index_dir)
+        start = time.perf_counter()
+        updated = index.refresh(force=True)
+        build_ms = (time.perf_counter() - start) * 1000
+        chunks = len(index.chunks) - len(index.free_rows)
+
+        start = time.perf_counter()
+        WorkspaceIndex(workspace_dir=workspace_dir, index_dir=index_dir).refresh(force=True)
+        reload_ms = (time.perf_counter() - start) * 1000
+
+        print(f"store={type(index.store).__name__} files={updated} chunks={chunks}")
+        print(f"   full build            : {build_ms:9.1f} ms")
+        print(f"   reload, nothing stale : {reload_ms:9.1f} ms")
+        index.refresh_interval = float("inf")  # time the queries alone
+        for query in queries:
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                snippets = index.search(query, top_k)
+                durations.append((time.perf_counter() - start) * 1000)
+            print(f"   query {query!r:40}: {median(durations):9.2f} ms")
+            print("\n".join(f"      {line}" for line in render_snippets(snippets).splitlines() if line.startswith("===")))
+
+if __name__ == "__main__":
+    main()
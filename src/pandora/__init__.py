@@ -1,28 +1,113 @@
 import click 
-from pandora.engine import Engine
-from pandora.mcp_servers_handler import MCPHandler
+from importlib import import_module
+from contextlib import nullcontext
 from os import getenv
-import asyncio
 from typing import Optional
 
+# heavy dependencies (openai, httpx, mcp, zmq) are imported on first use so that
+# `pandora --help` and short-lived invocations do not pay for them
+_LAZY_ATTRIBUTES = {
+    "Engine": "pandora.engine",
+    "MCPHandler": "pandora.mcp_servers_handler",
+    "ClientManager": "pandora.client_manager",
+}
+
+def __getattr__(name:str):
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(import_module(_LAZY_ATTRIBUTES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 @click.command()
 @click.option("--model", "-m", type=click.Choice(["gpt-4.1", "gpt-4.1-mini"]), default="gpt-4.1")
 @click.option("--openai_api_key", "-k", type=str, envvar="OPENAI_API_KEY", required=True)
 @click.option("--path2mcp_servers_file", "-mcp", type=click.Path(exists=False, dir_okay=False))
 @click.option("--startup_timeout", "-t", type=float, default=10.0)
 @click.option("--parallel_tool_calls", "-p", is_flag=True, default=False)
-def main(model:str, openai_api_key:str, path2mcp_servers_file:Optional[str]=None, startup_timeout:float=10.0, parallel_tool_calls:bool=False) -> None:
+@click.option("--requests_per_minute", "-rpm", type=int, default=500)
+@click.option("--tokens_per_minute", "-tpm", type=int, default=450_000)
+@click.option("--hedge", is_flag=True, default=False, help="fire a second request when the first token is late")
+@click.option("--hedge_percentile", type=click.FloatRange(0.5, 1.0), default=0.95)
+@click.option("--fallback_model", type=str, default=None, help="model used by the hedged request (defaults to --model)")
+@click.option("--fast_model", type=str, default=None, help="opt-in model for small edits and turns following print_message(notify/update) (defaults to --model, no routing)")
+@click.option("--session_dir", type=click.Path(file_okay=False), default=None, help="persist the session so that it can be resumed after a restart")
+@click.option("--session_id", type=str, default=None, help="resume this session (requires --session_dir)")
+@click.option("--fork_from", type=str, default=None, help="session_id[:seq] to fork the new session from, the whole history when seq is omitted (requires --session_dir)")
+@click.option("--record", "path2record", type=click.Path(dir_okay=False), default=None, help="record model streams and tool results to this cassette")
+@click.option("--replay", "path2replay", type=click.Path(exists=True, dir_okay=False), default=None, help="replay a recorded cassette instead of calling the model")
+@click.option("--replay_speed", type=float, default=1.0, help="timing factor for replayed streams, 0 means no delay")
+@click.option("--replay_tools", type=click.Choice(["stub", "real"]), default="stub")
+@click.option("--headless", is_flag=True, default=False, help="disable console rendering of streams and tool calls")
+@click.option("--exec_workers", type=int, default=4, help="number of execute_bash commands running at the same time across sessions")
+@click.option("--exec_cgroup_root", type=click.Path(file_okay=False), default=None, help="writable cgroup v2 directory for per-session cpu/memory quotas")
+@click.option("--max_plan_concurrency", type=click.IntRange(min=1), default=8, help="ceiling of the max_concurrency requested by execute_plan")
+@click.option("--workspace_dir", type=click.Path(exists=True, file_okay=False), default=".", help="directory indexed for retrieve_context")
+@click.option("--index_dir", type=click.Path(file_okay=False), default=None, help="where the workspace index is stored (defaults to ~/.cache/pandora/index)")
+@click.option("--embedding_model", type=str, default=None, help="sentence-transformers model for the workspace index (defaults to hashed tf-idf)")
+def main(model:str, openai_api_key:str, path2mcp_servers_file:Optional[str]=None, startup_timeout:float=10.0, parallel_tool_calls:bool=False, requests_per_minute:int=500, tokens_per_minute:int=450_000, hedge:bool=False, hedge_percentile:float=0.95, fallback_model:Optional[str]=None, fast_model:Optional[str]=None, session_dir:Optional[str]=None, session_id:Optional[str]=None, fork_from:Optional[str]=None, path2record:Optional[str]=None, path2replay:Optional[str]=None, replay_speed:float=1.0, replay_tools:str="stub", headless:bool=False, exec_workers:int=4, exec_cgroup_root:Optional[str]=None, max_plan_concurrency:int=8, workspace_dir:str=".", index_dir:Optional[str]=None, embedding_model:Optional[str]=None) -> None:
+    import asyncio
+    from pandora.session import SessionStore
+    from pandora.cassette import Cassette, CassetteMode
+
+    session_store = None
+    if session_dir is not None:
+        if fork_from is not None:
+            source_session_id, _, seq = fork_from.partition(":")
+            session_store = SessionStore.fork(session_dir, source_session_id, int(seq) if seq else None, session_id=session_id)
+        else:
+            session_store = SessionStore(session_dir=session_dir, session_id=session_id)
+        print(f"session id: {session_store.session_id}")
+
+    cassette = None
+    if path2record is not None and path2replay is not None:
+        raise click.UsageError("--record and --replay are mutually exclusive")
+    if path2record is not None:
+        cassette = Cassette(path2record, CassetteMode.RECORD)
+    if path2replay is not None:
+        cassette = Cassette(path2replay, CassetteMode.REPLAY, speed=replay_speed, stub_tools=replay_tools == "stub")
+
     async def main_loop():
+        from pandora.engine import Engine
+        from pandora.mcp_servers_handler import MCPHandler
+        from pandora.client_manager import ClientManager
+        from pandora.hedging import HedgingPolicy
+        from pandora.router import ModelRouter, RuleBasedPolicy
+        from pandora.renderer import Renderer, ConsoleRenderer
+        from pandora.execution_pool import ExecutionPool, ExecutionLimits
+        from pandora.workspace_index import WorkspaceIndex, HashedTfidfEmbedder, SentenceTransformerEmbedder
+
         print(parallel_tool_calls)
+        client_manager = ClientManager.get_instance(
+            openai_api_key,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute
+        )
         mcp_handler = MCPHandler(path2mcp_servers_file=path2mcp_servers_file, startup_timeout=startup_timeout)
         async with mcp_handler as mcp_handler:
             await mcp_handler.launch_mcp_servers()
-            engine = Engine(
-                mcp_handler=mcp_handler,
-                openai_api_key=openai_api_key, 
-                model=model,
-                parallel_tool_calls=parallel_tool_calls
+            renderer = Renderer() if headless else ConsoleRenderer()
+            execution_pool = ExecutionPool.get_instance(max_workers=exec_workers, limits=ExecutionLimits(cgroup_root=exec_cgroup_root))
+            workspace_index = WorkspaceIndex(
+                workspace_dir=workspace_dir,
+                index_dir=index_dir,
+                embedder=SentenceTransformerEmbedder(embedding_model) if embedding_model is not None else HashedTfidfEmbedder()
             )
-            async with engine as engine:
-                await engine.loop()
+            with session_store or nullcontext() as store, cassette or nullcontext() as tape:
+                engine = Engine(
+                    mcp_handler=mcp_handler,
+                    openai_api_key=openai_api_key, 
+                    model=model,
+                    parallel_tool_calls=parallel_tool_calls,
+                    client_manager=client_manager,
+                    hedging_policy=HedgingPolicy(enabled=hedge, percentile=hedge_percentile, fallback_model=fallback_model),
+                    router=ModelRouter(RuleBasedPolicy(flagship_model=model, fast_model=fast_model)),
+                    session_store=store,
+                    cassette=tape,
+                    renderer=renderer,
+                    execution_pool=execution_pool,
+                    workspace_index=workspace_index,
+                    max_plan_concurrency=max_plan_concurrency
+                )
+                async with execution_pool, renderer, engine as engine:
+                    await engine.loop()
+        await ClientManager.close_all()
     asyncio.run(main_loop())
@@ -0,0 +1,146 @@
+import json
+import time
+import asyncio
+from collections import deque
+from enum import Enum
+from typing import Any, AsyncIterable, AsyncIterator, Deque, Dict, List, Optional, Self, TYPE_CHECKING
+
+from pandora.log import logger
+from pandora.hedging import percentile
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionChunk
+
+class CassetteMode(str, Enum):
+    RECORD = "record"
+    REPLAY = "replay"
+
+class CassetteDivergence(RuntimeError):
+    """the replayed session asked for a stream or a tool result that was not recorded"""
+
+class RecordedStreamError(RuntimeError):
+    """a stream that failed while recording, the engine handles it like the live error"""
+
+class Cassette:
+    """
+    jsonl file of events : user queries, model streams (chunks with their arrival offset),
+    tool results and per-turn latencies. replaying feeds them back to the engine in order.
+    """
+    def __init__(self, path2cassette:str, mode:CassetteMode, speed:float=1.0, stub_tools:bool=True):
+        self.path2cassette = path2cassette
+        self.mode = mode
+        self.speed = speed  # 0 => replay as fast as possible
+        self.stub_tools = stub_tools
+
+        self.queries:Deque[str] = deque()
+        self.streams:Deque[Dict[str, Any]] = deque()
+        self.tools:Dict[str, str] = {}
+        self.recorded_latencies:List[float] = []
+        self.latencies:List[float] = []
+        self.file_pointer = None
+
+    def __enter__(self) -> Self:
+        if self.mode == CassetteMode.RECORD:
+            self.file_pointer = open(self.path2cassette, "w")
+            return self
+        with open(self.path2cassette, "r") as file_pointer:
+            for line in file_pointer:
+                event = json.loads(line)
+                match event["type"]:
+                    case "query":
+                        self.queries.append(event["content"])
+                    case "stream":
+                        self.streams.append(event)
+                    case "tool":
+                        self.tools[event["tool_call_id"]] = event["result"]
+                    case "turn":
+                        self.recorded_latencies.append(event["latency"])
+        logger.info(f"cassette {self.path2cassette} loaded : {len(self.queries)} queries, {len(self.streams)} turns, {len(self.tools)} tool results")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self.file_pointer is not None:
+            self.file_pointer.close()
+            self.file_pointer = None
+        if self.mode == CassetteMode.REPLAY:
+            report = self.latency_report()
+            with open(f"{self.path2cassette}.replay.json", "w") as file_pointer:
+                json.dump(report, file_pointer, indent=3)
+            logger.info(f"replay latency report : {json.dumps(report['summary'])}")
+
+    def _write(self, event:Dict[str, Any]) -> None:
+        self.file_pointer.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self.file_pointer.flush()
+
+    def next_query(self) -> str:
+        if len(self.queries) == 0:
+            return "exit"
+        return self.queries.popleft()
+
+    def record_query(self, query:str) -> None:
+        self._write({"type": "query", "content": query})
+
+    async def record_stream(self, stream:AsyncIterable["ChatCompletionChunk"]) -> AsyncIterator["ChatCompletionChunk"]:
+        chunks = []
+        error:Optional[str] = None
+        start = time.monotonic()
+        try:
+            async for chunk in stream:
+                chunks.append({"t": round(time.monotonic() - start, 4), "chunk": chunk.model_dump(mode="json")})
+                yield chunk
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            # a stream that failed midway is still a turn: keep the cassette aligned with the engine
+            event = {"type": "stream", "chunks": chunks}
+            if error is not None:
+                event["error"] = error
+            self._write(event)
+
+    async def replay_stream(self) -> AsyncIterator["ChatCompletionChunk"]:
+        from openai.types.chat import ChatCompletionChunk
+        if len(self.streams) == 0:
+            raise CassetteDivergence(f"cassette {self.path2cassette} has no more recorded model streams")
+        event = self.streams.popleft()
+        start = time.monotonic()
+        for item in event["chunks"]:
+            if self.speed > 0:
+                delay = item["t"] / self.speed - (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield ChatCompletionChunk.model_validate(item["chunk"])
+        if "error" in event:
+            raise RecordedStreamError(f"recorded stream error: {event['error']}")
+
+    def record_tool(self, tool_call_id:str, name:str, result:str) -> None:
+        self._write({"type": "tool", "tool_call_id": tool_call_id, "name": name, "result": result})
+
+    def replay_tool(self, tool_call_id:str) -> str:
+        if tool_call_id not in self.tools:
+            raise CassetteDivergence(f"tool call {tool_call_id} was not recorded in {self.path2cassette}")
+        return self.tools[tool_call_id]
+
+    def record_turn(self, latency:float) -> None:
+        if self.mode == CassetteMode.RECORD:
+            self._write({"type": "turn", "latency": round(latency, 4)})
+        else:
+            self.latencies.append(latency)
+
+    def latency_report(self) -> Dict[str, Any]:
+        turns = [
+            {"turn": index, "recorded": recorded, "replayed": round(replayed, 4), "delta": round(replayed - recorded, 4)}
+            for index, (recorded, replayed) in enumerate(zip(self.recorded_latencies, self.latencies))
+        ]
+        return {
+            "speed": self.speed,
+            "stub_tools": self.stub_tools,
+            "summary": {
+                "turns": len(self.latencies),
+                "recorded_p50": percentile(self.recorded_latencies, 0.5),
+                "replayed_p50": round(percentile(self.latencies, 0.5), 4),
+                "recorded_p99": percentile(self.recorded_latencies, 0.99),
+                "replayed_p99": round(percentile(self.latencies, 0.99), 4),
+            },
+            "turns": turns
+        }
@@ -0,0 +1,186 @@
+import asyncio
+import random
+import time
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Self
+
+from pandora.log import logger
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    def __init__(self, capacity:float, refill_per_second:float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.mutex = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    async def acquire(self, amount:float) -> None:
+        amount = min(amount, self.capacity)  # a single oversized request must still be able to pass
+        async with self.mutex:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.refill_per_second)
+
+    def drain(self) -> None:
+        self.tokens = 0
+        self.updated_at = time.monotonic()
+
+class RateLimiter:
+    def __init__(self, requests_per_minute:int, tokens_per_minute:int):
+        self.requests_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.blocked_until = 0.0
+
+    async def acquire(self, estimated_tokens:int) -> None:
+        delay = self.blocked_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.requests_bucket.acquire(1)
+        await self.tokens_bucket.acquire(estimated_tokens)
+
+    def block_for(self, seconds:float) -> None:
+        # a 429 means the server side budget is exhausted for every caller, not only the current one
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.requests_bucket.drain()
+
+class ClientManager:
+    _instances:Dict[str, "ClientManager"] = {}
+
+    def __init__(
+        self,
+        openai_api_key:str,
+        requests_per_minute:int=500,
+        tokens_per_minute:int=450_000,
+        max_connections:int=100,
+        max_keepalive_connections:int=20,
+        keepalive_expiry:float=60.0,
+        max_retries:int=6,
+        base_delay:float=0.5,
+        max_delay:float=60.0
+        ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+        import httpx  # deferred: httpx and openai dominate the cli startup time
+        from openai import AsyncOpenAI
+
+        self.http_client = httpx.AsyncClient(
+            http2=True,  # h2 comes with the httpx[http2] dependency
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=httpx.Timeout(timeout=600.0, connect=10.0)
+        )
+        # retries are handled here so that they are shared with the rate limiter
+        self.openai_client = AsyncOpenAI(api_key=openai_api_key, http_client=self.http_client, max_retries=0)
+
+    @classmethod
+    def get_instance(cls, openai_api_key:str, **kwargs) -> Self:
+        if openai_api_key not in cls._instances:
+            cls._instances[openai_api_key] = cls(openai_api_key=openai_api_key, **kwargs)
+        return cls._instances[openai_api_key]
+
+    @classmethod
+    async def close_all(cls) -> None:
+        for instance in cls._instances.values():
+            await instance.http_client.aclose()
+        cls._instances.clear()
+
+    def estimate_tokens(self, kwargs:Dict[str, Any], estimated_prompt_size:Optional[int]=None) -> int:
+        if estimated_prompt_size is None and "encoded_messages" in kwargs:
+            estimated_prompt_size = len(kwargs["encoded_messages"])
+        if estimated_prompt_size is None:
+            estimated_prompt_size = len(json.dumps(kwargs.get("messages", []), default=str))
+        prompt_size = estimated_prompt_size + len(json.dumps(kwargs.get("tools", []), default=str))
+        completion_size = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 4096
+        return prompt_size // 4 + min(completion_size, 16_384)
+
+    def _retry_delay(self, attempt:int, error:Exception) -> float:
+        from openai import APIStatusError
+        retry_after:Optional[float] = None
+        if isinstance(error, APIStatusError):
+            headers = error.response.headers
+            if "retry-after-ms" in headers:
+                retry_after = float(headers["retry-after-ms"]) / 1000
+            elif "retry-after" in headers:
+                try:
+                    retry_after = float(headers["retry-after"])
+                except ValueError:
+                    retry_after = None
+        exponential = min(self.max_delay, self.base_delay * 2 ** attempt)
+        jittered = random.uniform(0, exponential)  # full jitter
+        if retry_after is not None:
+            return min(self.max_delay, retry_after + jittered * 0.1)
+        return jittered
+
+    def _is_retryable(self, error:Exception) -> bool:
+        from openai import APIStatusError, APIConnectionError, APITimeoutError
+        if isinstance(error, (APIConnectionError, APITimeoutError)):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code in RETRYABLE_STATUS_CODES
+        return False
+
+    async def _create_from_encoded(self, encoded_messages:bytes, **kwargs) -> Any:
+        # the sdk json-encodes the whole body on every call: the history is posted as the
+        # caller's cached fragments instead and the response parsed with the sdk stream class
+        import httpx
+        from openai import AsyncStream, APIConnectionError, APITimeoutError
+        from openai.types.chat import ChatCompletionChunk
+        if not kwargs.get("stream"):
+            raise ValueError("encoded_messages is only supported for streamed completions")
+        params = json.dumps(kwargs, separators=(",", ":")).encode()
+        body = params[:-1] + b',"messages":' + encoded_messages + b"}"
+        headers = {key: value for key, value in self.openai_client.default_headers.items() if isinstance(value, str)}
+        request = self.http_client.build_request("POST", self.openai_client.base_url.join("chat/completions"), content=body, headers=headers)
+        try:
+            response = await self.http_client.send(request, stream=True)
+        except httpx.TimeoutException as e:
+            raise APITimeoutError(request=request) from e
+        except httpx.TransportError as e:
+            raise APIConnectionError(request=request) from e
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+            raise self.openai_client._make_status_error_from_response(response)
+        return AsyncStream(cast_to=ChatCompletionChunk, response=response, client=self.openai_client)
+
+    async def _request(self, target_function:Callable[..., Awaitable[Any]], estimated_prompt_size:Optional[int]=None, **kwargs) -> Any:
+        # callers holding cached message fragments pass their size to avoid re-serializing the history
+        estimated_tokens = self.estimate_tokens(kwargs, estimated_prompt_size)
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(estimated_tokens)
+            try:
+                return await target_function(**kwargs)
+            except Exception as e:
+                if not self._is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt, e)
+                if getattr(e, "status_code", None) == 429:
+                    self.rate_limiter.block_for(delay)
+                logger.warning(f"openai request failed ({e.__class__.__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def create(self, **kwargs) -> Any:
+        if "encoded_messages" in kwargs:  # pre-encoded json array of messages, see MessageStore.encode
+            return await self._request(self._create_from_encoded, **kwargs)
+        return await self._request(self.openai_client.chat.completions.create, **kwargs)
+
+    async def parse(self, **kwargs) -> Any:
+        return await self._request(self.openai_client.chat.completions.parse, **kwargs)
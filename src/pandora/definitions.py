@@ -78,6 +78,77 @@ READ_FILE = {
     }
 }
 
+READ_FILES = {
+    "type": "function",
+    "function": {
+        "name": "read_files",
+        "description": """
+        Read several files in one call and return their contents combined.
+        This function provides:
+        - Paths or glob patterns (** is recursive), e.g. "src/**/*.py"
+        - Optional line ranges (start_line, end_line, 1-based and inclusive) per entry
+        - Concurrent reads, much faster than successive read_file calls
+        - A total byte budget shared by the files in request order, truncated files are flagged
+        - Binary files, unreadable and missing paths reported instead of failing the call
+
+        Prefer this over read_file when exploring a project or reading more than one file.
+        """,
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "files": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "path": {"type": "string", "description": "File path or glob pattern"},
+                            "start_line": {"type": "integer"},
+                            "end_line": {"type": "integer"}
+                        },
+                        "required": ["path"]
+                    }
+                },
+                "max_bytes": {
+                    "type": "integer",
+                    "default": 200000,
+                    "description": "Total number of bytes returned across all files"
+                }
+            },
+            "required": ["files"]
+        }
+    }
+}
+
+RETRIEVE_CONTEXT = {
+    "type": "function",
+    "function": {
+        "name": "retrieve_context",
+        "description": """
+        Search the local workspace index and return the most relevant code or text snippets for a query.
+        This function provides:
+        - Ranked snippets (path, line range, score) instead of whole files
+        - An index kept up to date with the workspace (changed files are re-indexed before the search)
+        - Optional restriction to paths matching a glob pattern (e.g. "src/*.py")
+        - Millisecond queries, no network access
+
+        Use it first to locate relevant code, then read_files with line ranges to see more context.
+        Describe what the code does or name the identifiers you are looking for.
+        """,
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string"},
+                "top_k": {"type": "integer", "default": 8},
+                "path_glob": {
+                    "type": "string",
+                    "description": "Only return snippets from paths (relative to the workspace) matching this glob pattern"
+                }
+            },
+            "required": ["query"]
+        }
+    }
+}
+
 CREATE_FILE = {
     "type": "function",
     "function": {
@@ -243,6 +314,10 @@ GENERATE_PLAN = {
        - o4-mini: Cutting-edge reasoning for the most demanding analytical tasks
        
        For replanning: Include context about previous attempts, what failed, and lessons learned in the task description.
+
+       Output:
+       - a plan_id and a list of steps (id, title, description, priority, depends_on)
+       - the plan_id can be given to execute_plan to run independent steps in parallel
        """,
        "parameters": {
            "type": "object",
@@ -315,3 +390,40 @@ APPLY_REGEX = {
     }
 }
 
+MAX_PLAN_CONCURRENCY = 8  # default ceiling of execute_plan, the engine patches the schema with its own
+
+EXECUTE_PLAN = {
+    "type": "function",
+    "function": {
+        "name": "execute_plan",
+        "description": """
+        Execute a plan created by generate_plan as a dependency graph of child agents.
+        This function provides:
+        - Concurrent execution of independent steps (steps whose depends_on are all completed)
+        - One child agent per step, sharing tools and MCP servers with the current agent
+        - Results of the dependencies forwarded to each step
+        - Per step status (success, failed, skipped), result and duration
+        - Steps depending on a failed step are skipped
+
+        Use this for multi-part tasks whose steps are independent (e.g. scaffolding separate modules).
+        Keep sequential, tightly coupled work in the current trajectory.
+        """,
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "plan_id": {
+                    "type": "string",
+                    "description": "The plan_id returned by generate_plan"
+                },
+                "max_concurrency": {
+                    "type": "integer",
+                    "default": 4,
+                    "minimum": 1,
+                    "maximum": MAX_PLAN_CONCURRENCY,
+                    "description": "Maximum number of steps executed at the same time, clamped to the allowed range"
+                }
+            },
+            "required": ["plan_id"]
+        }
+    }
+}
@@ -1,41 +1,84 @@
 import asyncio 
 import json
+import time
 import re 
+from copy import deepcopy
 from enum import Enum
 from operator import itemgetter, attrgetter
-from typing import List, Tuple, Dict, Any, Optional, AsyncIterable, AsyncGenerator, Self
-
-from pydantic import BaseModel
+from typing import List, Tuple, Dict, Any, Optional, AsyncIterable, AsyncGenerator, Self, TYPE_CHECKING
 
 from os import path, makedirs
-import subprocess
+from uuid import uuid4
 
-from openai import AsyncOpenAI
-from openai.types.chat import ChatCompletionChunk, ChatCompletion, ParsedChatCompletion
 from pandora.log import logger 
 from pandora.system_config import SystemConfig
-from pandora.types import ChatMessage, FinishReason, Role
+from pandora.types import ChatMessage, FinishReason, Role, Plan
 from pandora.mcp_servers_handler import MCPHandler
+from pandora.client_manager import ClientManager
+from pandora.hedging import HedgingPolicy, RequestHedger
+from pandora.router import ModelRouter, RuleBasedPolicy, RoutingContext, CallKind
+from pandora.session import SessionStore
+from pandora.cassette import Cassette, CassetteMode, CassetteDivergence, RecordedStreamError
+from pandora.plan_executor import PlanExecutor
+from pandora.streaming import StreamingFileWriter
+from pandora.message_store import MessageStore, StoredMessage
+from pandora.renderer import Renderer, ConsoleRenderer
+from pandora.execution_pool import ExecutionPool
+from pandora.file_reader import FileReader, parse_specs, render_slices
+from pandora.workspace_index import WorkspaceIndex, render_snippets
 
 from pandora.definitions import (
-    PRINT_MESSAGE, READ_FILE, CREATE_FILE, 
-    EDIT_FILE, SEARCH_THROUGH_WEB, GENERATE_PLAN, EXECUTE_BASH, APPLY_REGEX
+    PRINT_MESSAGE, READ_FILE, READ_FILES, RETRIEVE_CONTEXT, CREATE_FILE, 
+    EDIT_FILE, SEARCH_THROUGH_WEB, GENERATE_PLAN, EXECUTE_BASH, APPLY_REGEX, EXECUTE_PLAN, MAX_PLAN_CONCURRENCY
 )
 
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionChunk
+
 FLAGS = ["IGNORECASE", "MULTILINE", "DOTALL", "VERBOSE", "ASCII", "LOCALE"]
 
+CORE_TOOLS = [
+    PRINT_MESSAGE, READ_FILE, READ_FILES, RETRIEVE_CONTEXT, CREATE_FILE, 
+    EDIT_FILE, SEARCH_THROUGH_WEB, GENERATE_PLAN, EXECUTE_BASH, APPLY_REGEX, EXECUTE_PLAN
+]
+CHILD_TOOLS = [tool for tool in CORE_TOOLS if tool is not EXECUTE_PLAN]  # plans do not nest, max_concurrency stays a global bound
+INTERACTIVE_TOOLS = [PRINT_MESSAGE]  # any other tool is rejected by handle_tool_call in interactive mode
+SYSTEM_MESSAGE = StoredMessage(role=Role.SYSTEM, content=SystemConfig.ACTOR_SYSTEM_PROMPT.value)
+SYSTEM_MESSAGE_SIZE = len(SYSTEM_MESSAGE.encoded())
+
 # nice, please create a workspace dir and inside, create a full python project for clustering with sentence transformers and umap, this will build clustering image. create a plan and think step bu step. do not install depdenencies, modular project.
 
 class Engine:
-    def __init__(self, mcp_handler:MCPHandler, openai_api_key:str, model:str="gpt-4.1", parallel_tool_calls:bool=True):
+    def __init__(self, mcp_handler:MCPHandler, openai_api_key:str, model:str="gpt-4.1", parallel_tool_calls:bool=True, client_manager:Optional[ClientManager]=None, hedging_policy:Optional[HedgingPolicy]=None, router:Optional[ModelRouter]=None, session_store:Optional[SessionStore]=None, cassette:Optional[Cassette]=None, renderer:Optional[Renderer]=None, execution_pool:Optional[ExecutionPool]=None, file_reader:Optional[FileReader]=None, workspace_index:Optional[WorkspaceIndex]=None, session_id:Optional[str]=None, max_plan_concurrency:int=MAX_PLAN_CONCURRENCY):
         self.model = model 
         self.openai_api_key = openai_api_key
          
-        self.openai_client = AsyncOpenAI(api_key=openai_api_key)
+        self.client_manager = client_manager or ClientManager.get_instance(openai_api_key)
+        self.hedger:Optional[RequestHedger] = None
+        if hedging_policy is not None and hedging_policy.enabled:
+            self.hedger = RequestHedger(hedging_policy, self.client_manager)
         self.parallel_tool_calls = parallel_tool_calls
+        self.router = router or ModelRouter(RuleBasedPolicy(flagship_model=model))
+        self.turn_model = model
+        self.last_tools:List[str] = []
         
         self.mcp_handler = mcp_handler
         self.internal_state = 0  # 0: interactive, 1: autonomous
+        self.session_store = session_store
+        self.session_id = session_id or (session_store.session_id if session_store is not None else uuid4().hex)
+        self.execution_pool = execution_pool or ExecutionPool.get_instance()
+        self.file_reader = file_reader or FileReader()
+        self.workspace_index = workspace_index or WorkspaceIndex()
+        self.cassette = cassette
+        self.renderer = renderer or ConsoleRenderer()
+        self.plans:Dict[str, Plan] = {}
+        self.max_plan_concurrency = max(max_plan_concurrency, 1)
+        self.tools_cache:Dict[Tuple[int, int], Tuple[List[Dict[str, Any]], int]] = {}
+        self.tool_stats = {"requests": 0, "tool_calls": 0, "rejected_calls": 0, "estimated_tokens_saved": 0}
+        self.last_message:Optional[str] = None
+        self.last_message_type:Optional[str] = None
+        self.depth = 0  # 0 for the top level engine, children of execute_plan are at depth 1
+        self.file_writers:Dict[str, StreamingFileWriter] = {}  # create_file calls written to disk while streaming
         
     async def __aenter__(self) -> Self:
         return self
@@ -44,29 +87,66 @@ class Engine:
         if exc_type is not None:
             logger.error(exc_value)
             logger.exception(traceback)
+        if self.hedger is not None:
+            logger.info(f"hedging stats: {self.hedger.stats.summary()}")
+        logger.info(f"tool exposure stats: {self.tool_stats}")
+        logger.info(f"execution usage: {self.execution_pool.usage(self.session_id)[self.session_id].model_dump()}")
+        await self.renderer.flush()
+
+    def _build_tools(self, internal_state:int, mcp_tools:List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        if internal_state == 0:
+            tools = list(INTERACTIVE_TOOLS)
+        else:
+            tools = list(CORE_TOOLS if self.depth == 0 else CHILD_TOOLS)
+            if self.depth == 0 and self.max_plan_concurrency != MAX_PLAN_CONCURRENCY:
+                execute_plan = deepcopy(EXECUTE_PLAN)
+                execute_plan["function"]["parameters"]["properties"]["max_concurrency"]["maximum"] = self.max_plan_concurrency
+                tools[tools.index(EXECUTE_PLAN)] = execute_plan
+            for tool in mcp_tools:
+                tools.append({
+                    "type": "function",
+                    "function": {
+                        "name": tool["name"],
+                        "description": tool["description"],
+                        "parameters": tool["inputSchema"]
+                    }
+                })
+        return tools, len(json.dumps(tools))
+
+    def get_tools(self) -> List[Dict[str, Any]]:
+        # schema variants are built once per (state, number of mcp tools), mcp servers only ever add tools
+        mcp_tools = self.mcp_handler.get_tools()
+        for internal_state in (0, 1):
+            key = (internal_state, len(mcp_tools))
+            if key not in self.tools_cache:
+                self.tools_cache[key] = self._build_tools(internal_state, mcp_tools)
+        tools, size = self.tools_cache[(self.internal_state, len(mcp_tools))]
+        _, full_size = self.tools_cache[(1, len(mcp_tools))]
+        self.tool_stats["requests"] += 1
+        self.tool_stats["estimated_tokens_saved"] += (full_size - size) // 4
+        return tools
     
-    async def handle_messages(self, messages:List[ChatMessage]) -> AsyncIterable[ChatCompletionChunk]:
-        tools = [
-            PRINT_MESSAGE, READ_FILE, CREATE_FILE, 
-            EDIT_FILE, SEARCH_THROUGH_WEB, GENERATE_PLAN, EXECUTE_BASH, APPLY_REGEX
-        ]
-        for tool in self.mcp_handler.get_tools():
-            tools.append({
-                "type": "function",
-                "function": {
-                    "name": tool["name"],
-                    "description": tool["description"],
-                    "parameters": tool["inputSchema"]
-                }
-            })
+    async def handle_messages(self, messages:MessageStore) -> AsyncIterable["ChatCompletionChunk"]:
+        tools = self.get_tools()
+        prompt_size = messages.size
+        self.turn_model = self.router.route(
+            RoutingContext(
+                call_kind=CallKind.TURN,
+                requested_model=self.model,
+                internal_state=self.internal_state,
+                prompt_size=prompt_size,
+                last_tools=self.last_tools,
+                last_message_type=self.last_message_type
+            )
+        )
+        if self.cassette is not None and self.cassette.mode == CassetteMode.REPLAY:
+            return self.cassette.replay_stream()
 
-       
-        response = await self.openai_client.chat.completions.create(
-            model=self.model,
-            messages=[
-                ChatMessage(role=Role.SYSTEM, content=SystemConfig.ACTOR_SYSTEM_PROMPT),
-                *messages
-            ],
+        create = self.client_manager.create if self.hedger is None else self.hedger.create
+        response = await create(
+            model=self.turn_model,
+            encoded_messages=messages.encode(SYSTEM_MESSAGE),  # cached fragments, never re-encoded
+            estimated_prompt_size=SYSTEM_MESSAGE_SIZE + prompt_size,
             stream=True, 
             max_tokens=8192,
             tool_choice="required",
@@ -74,78 +154,189 @@ class Engine:
             parallel_tool_calls=self.parallel_tool_calls,
         )
 
+        if self.cassette is not None:
+            return self.cassette.record_stream(response)
         return response
     
-    async def handle_response(self, response:AsyncIterable[ChatCompletionChunk]) -> Tuple[str, str, Dict[int, Dict[str, Any]]]:
+    async def handle_response(self, response:AsyncIterable["ChatCompletionChunk"]) -> Tuple[str, str, Dict[int, Dict[str, Any]]]:
         finish_reason, content, tools_hmap = FinishReason.STOP, "", {}
-        async for chunk in response:
-            if chunk.choices[0].finish_reason is not None:
-                finish_reason = chunk.choices[0].finish_reason
-                
-            delta_content = chunk.choices[0].delta.content or ""
-            print(delta_content, end="", flush=True)  
-            content = content + delta_content
-            tool_calls = chunk.choices[0].delta.tool_calls
-            if tool_calls is None:
-                continue
-            if len(tool_calls) == 0:
-                continue
-            if tool_calls[0].index not in tools_hmap:
-                tools_hmap[tool_calls[0].index] = tool_calls[0]
-                logger.info(f"{tool_calls[0].function.name} will be called")
-                continue
-
-            tools_hmap[tool_calls[0].index].function.arguments += tool_calls[0].function.arguments
+        writers:Dict[int, StreamingFileWriter] = {}
+        try:
+            async for chunk in response:
+                if chunk.choices[0].finish_reason is not None:
+                    finish_reason = chunk.choices[0].finish_reason
+                    
+                delta_content = chunk.choices[0].delta.content or ""
+                self.renderer.stream_delta(delta_content)
+                content = content + delta_content
+                tool_calls = chunk.choices[0].delta.tool_calls
+                if tool_calls is None:
+                    continue
+                if len(tool_calls) == 0:
+                    continue
+                index, arguments_delta = tool_calls[0].index, tool_calls[0].function.arguments or ""
+                if index not in tools_hmap:
+                    tools_hmap[index] = tool_calls[0]
+                    tools_hmap[index].function.arguments = arguments_delta
+                    logger.info(f"{tool_calls[0].function.name} will be called")
+                    if tool_calls[0].function.name == "create_file":
+                        writers[index] = StreamingFileWriter()
+                        writers[index].feed(arguments_delta)
+                    continue
+
+                tools_hmap[index].function.arguments += arguments_delta
+                if index in writers:
+                    writers[index].feed(arguments_delta)
+        except BaseException:
+            for writer in writers.values():
+                writer.abort()
+            raise
         
-        print("")
+        for index, writer in writers.items():
+            self.file_writers[tools_hmap[index].id] = writer
+        self.renderer.end_stream()
         return finish_reason, content, tools_hmap
     
-    async def handle_assistant_response(self, stop_reason:str, content:str, tools_hmap:Dict[int, Dict[str, Any]]) -> List[ChatMessage]:
-        messages = []
+    async def handle_assistant_response(self, messages:MessageStore, stop_reason:str, content:str, tools_hmap:Dict[int, Dict[str, Any]]) -> None:
+        # the assistant message is recorded before its tools run and every result as soon as it is available:
+        # a restart during a long tool call resumes after the model call instead of repeating it
+        if stop_reason != FinishReason.TOOL_CALLS:
+            # the tool calls will never run (e.g. finish_reason=length): drop their partial files
+            for writer in self.file_writers.values():
+                writer.abort()
+            self.file_writers.clear()
         match stop_reason:
             case FinishReason.STOP:
-                messages.append(
+                self.record_messages(messages, [
                     ChatMessage(
                         role=Role.ASSISTANT,
                         content=content
                     )
-                )
+                ])
             case FinishReason.TOOL_CALLS:
-                messages.append(
+                self.record_messages(messages, [
                     ChatMessage(
                         role=Role.ASSISTANT,
-                        tool_calls=[tool_call.model_dump() for tool_call in tools_hmap.values()]
+                        tool_calls=[
+                            {
+                                "id": tool_call.id,
+                                "type": "function",
+                                "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments}
+                            }
+                            for tool_call in tools_hmap.values()
+                        ]
                     )
-                )
-                async_call = []
-                for index, tool_call in tools_hmap.items():
-                    async_call.append(self.handle_tool_call(tool_call))
-                result = await asyncio.gather(*async_call, return_exceptions=True)
-                messages.extend(result)
+                ])
+
+                async def run_tool_call(tool_call:Dict[str, Any]) -> ChatMessage:
+                    message = await self.handle_tool_call(tool_call)
+                    self.record_messages(messages, [message])
+                    return message
+
+                result = await asyncio.gather(*[run_tool_call(tool_call) for tool_call in tools_hmap.values()], return_exceptions=True)
+                divergence = next((message for message in result if isinstance(message, CassetteDivergence)), None)
+                if divergence is not None:
+                    raise divergence
+                self.last_tools = [tool_call.function.name for tool_call in tools_hmap.values()]
+                success = all(isinstance(message, ChatMessage) and not (message.content or "").startswith("Error:") for message in result)
+                self.router.record(CallKind.TURN, self.turn_model, success)
             case _:
                 pass
-        return messages
                 
+    def record_messages(self, messages:MessageStore, messages_delta:List[ChatMessage]) -> None:
+        if self.session_store is None:
+            messages.extend(messages_delta)
+        else:
+            self.session_store.extend(messages_delta, self.internal_state)  # messages is the store's list
+
+    def restore_session(self) -> Tuple[FinishReason, MessageStore]:
+        if self.session_store is None:
+            return FinishReason.STOP, MessageStore()
+        messages = self.session_store.messages
+        self.internal_state = self.session_store.internal_state
+        if len(messages) == 0:
+            return FinishReason.STOP, messages
+
+        # tool calls that were running when the process died have no result: close them so the history stays valid
+        last_assistant = next((message for message in reversed(messages) if message.role == Role.ASSISTANT), None)
+        if last_assistant is not None and last_assistant.tool_calls:
+            answered = {message.tool_call_id for message in messages if message.role == Role.TOOL}
+            interrupted = [
+                ChatMessage(role=Role.TOOL, content="Error: tool call interrupted by a restart", tool_call_id=tool_call["id"])
+                for tool_call in last_assistant.tool_calls if tool_call["id"] not in answered
+            ]
+            self.record_messages(messages, interrupted)
+
+        if messages[-1].role == Role.TOOL and self.internal_state == 1:
+            return FinishReason.TOOL_CALLS, messages  # resume the autonomous trajectory without asking the user
+        return FinishReason.STOP, messages
+
+    def spawn_child(self) -> "Engine":
+        # children share the client, the mcp workers and the routing history but have their own trajectory
+        child = Engine(
+            mcp_handler=self.mcp_handler,
+            openai_api_key=self.openai_api_key,
+            model=self.model,
+            parallel_tool_calls=self.parallel_tool_calls,
+            client_manager=self.client_manager,
+            router=self.router,
+            renderer=self.renderer,
+            execution_pool=self.execution_pool,
+            file_reader=self.file_reader,
+            workspace_index=self.workspace_index,
+            session_id=self.session_id  # children count against the fair share of their session
+        )
+        child.hedger = self.hedger
+        child.depth = self.depth + 1
+        return child
+
+    async def run_task(self, task:str, max_turns:int=50) -> str:
+        self.internal_state = 1  # children start in autonomous mode, there is no user to talk to
+        messages = MessageStore([ChatMessage(role=Role.USER, content=task)])
+        for _ in range(max_turns):
+            response = await self.handle_messages(messages)
+            finish_reason, content, tools_hmap = await self.handle_response(response)
+            await self.handle_assistant_response(messages, finish_reason, content, tools_hmap)
+            if finish_reason != FinishReason.TOOL_CALLS:
+                return content
+            if self.internal_state == 0:
+                return self.last_message
+        raise TimeoutError(f"task did not terminate after {max_turns} turns")
+
     async def loop(self):
         keep_looping = True 
         query = ""
-        finish_reason, messages = FinishReason.STOP, []
+        finish_reason, messages = self.restore_session()
         while keep_looping:
             try:
                 if self.internal_state == 0 or finish_reason != FinishReason.TOOL_CALLS:  # interactive mode: agent/user conversation
-                    query = input("Enter a query: ")
-                    messages.append(ChatMessage(role=Role.USER, content=query))
-                if query in ["EXIT", "exit", "q", "quit"]:
-                    keep_looping = False 
-                    continue
+                    if self.session_store is not None:
+                        self.session_store.checkpoint()
+                    await self.renderer.flush()  # the prompt must come after the pending output
+                    if self.cassette is not None and self.cassette.mode == CassetteMode.REPLAY:
+                        query = self.cassette.next_query()
+                    else:
+                        query = input("Enter a query: ")
+                    if self.cassette is not None and self.cassette.mode == CassetteMode.RECORD:
+                        self.cassette.record_query(query)
+                    if query in ["EXIT", "exit", "q", "quit"]:
+                        keep_looping = False  # not recorded: a resumed session must not start with an exit turn
+                        continue
+                    self.record_messages(messages, [ChatMessage(role=Role.USER, content=query)])
+                turn_start = time.monotonic()
                 response = await self.handle_messages(messages)
                 finish_reason, content, tools_hmap = await self.handle_response(response)
-                messages_delta = await self.handle_assistant_response(finish_reason, content, tools_hmap)
-                messages.extend(messages_delta)
+                await self.handle_assistant_response(messages, finish_reason, content, tools_hmap)
+                if self.cassette is not None:
+                    self.cassette.record_turn(time.monotonic() - turn_start)
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"engine loop error: {e}")
+                if self.cassette is not None and self.cassette.mode == CassetteMode.REPLAY:
+                    if isinstance(e, RecordedStreamError):
+                        continue  # the recorded session retried after this error: go on with the next recorded stream
+                    break  # a replay cannot recover from a divergence
                 await asyncio.sleep(1)
     
 
@@ -153,17 +344,21 @@ class Engine:
         tool_call_id = tool_call.id
         name = tool_call.function.name
         arguments = tool_call.function.arguments
+        self.tool_stats["tool_calls"] += 1
+        writer = self.file_writers.pop(tool_call_id, None)
         try:
             if self.internal_state == 0:  # interactive mode: agent/user conversation
                 if name != "print_message":
+                    self.tool_stats["rejected_calls"] += 1
                     self.internal_state = 1 # change to autonomous mode
                     raise ValueError(f"Tool {name} is not allowed in interactive mode, only print_message is allowed")
             kwargs = json.loads(arguments)
-            print("="*50)
-            print(name)
-            print("="*50)
-            print(json.dumps(kwargs, indent=3))
-            if "mcp__" in name:  # next time use regex for this
+            self.renderer.tool_call(name, kwargs)
+            if self.cassette is not None and self.cassette.mode == CassetteMode.REPLAY and self.cassette.stub_tools and name != "print_message":
+                result = self.cassette.replay_tool(tool_call_id)  # print_message drives the state machine, it always runs
+            elif writer is not None and writer.commit(kwargs["file_path"], len(kwargs["content"])):
+                result = f"File {kwargs['file_path']} was created"  # content already streamed to disk
+            elif "mcp__" in name:  # next time use regex for this
                 result = await self.mcp_handler.execute_tool(
                     name=name,
                     arguments=kwargs    
@@ -171,10 +366,18 @@ class Engine:
             else:
                 target_function = attrgetter(name)(self)
                 result = await target_function(**kwargs)
-            print(result)
+            self.renderer.tool_result(name, result)
+        except CassetteDivergence:
+            raise  # stops the replay, an error result would make it diverge further
         except Exception as e:
             logger.error(e)
             result = f"Error: {str(e)}"
+        finally:
+            if writer is not None:
+                writer.abort()  # rejected, malformed or not committed: drop the temp file
+
+        if self.cassette is not None and self.cassette.mode == CassetteMode.RECORD:
+            self.cassette.record_tool(tool_call_id, name, result)
 
         return ChatMessage(
             role=Role.TOOL,
@@ -190,6 +393,8 @@ class Engine:
                 self.internal_state = 1
             case _:
                 raise ValueError(f"Invalid message type: {message_type}")
+        self.last_message = message
+        self.last_message_type = message_type
         return json.dumps({
             "message": message,
             "message_type": message_type,
@@ -203,6 +408,14 @@ class Engine:
             content = file.read()
         return content
     
+    async def read_files(self, files:List[Any], max_bytes:int=200_000) -> str:
+        slices, missing = await self.file_reader.read(parse_specs(files), max_bytes)
+        return render_slices(slices, missing)
+    
+    async def retrieve_context(self, query:str, top_k:int=8, path_glob:Optional[str]=None) -> str:
+        snippets = await self.workspace_index.retrieve(query, top_k, path_glob)
+        return render_snippets(snippets)
+    
     async def create_file(self, file_path:str, content:str) -> str:
         dir_path = path.dirname(file_path)
         if dir_path:
@@ -243,7 +456,15 @@ class Engine:
         with open(file_path, "r") as file:
             old_content = file.read()
         
-        response = await self.openai_client.chat.completions.create(
+        model = self.router.route(
+            RoutingContext(
+                call_kind=CallKind.EDIT_FILE,
+                requested_model=model,
+                internal_state=self.internal_state,
+                prompt_size=len(old_content)
+            )
+        )
+        response = await self.client_manager.create(
             model=model,
             messages=[
                 {
@@ -261,12 +482,16 @@ class Engine:
             max_tokens=32768
         )
         new_content = response.choices[0].message.content
+        self.router.record(CallKind.EDIT_FILE, model, new_content is not None and len(new_content) > 0)
         with open(file_path, "w") as file:
             file.write(new_content)
         return f"File {file_path} was edited, you can now read the file to see the changes"
     
     async def search_through_web(self, query:str, model:str="gpt-4o-mini-search-preview", search_context_size:str="low", max_tokens:int=1024) -> str:
-        response = await self.openai_client.chat.completions.create(
+        model = self.router.route(
+            RoutingContext(call_kind=CallKind.SEARCH_THROUGH_WEB, requested_model=model, internal_state=self.internal_state, prompt_size=len(query))
+        )
+        response = await self.client_manager.create(
             model=model,
             web_search_options={
                 "search_context_size": search_context_size
@@ -283,11 +508,13 @@ class Engine:
         return content
     
     async def execute_bash(self, command:str, timeout:int=10) -> str:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
+        result = await self.execution_pool.run(self.session_id, command, timeout)
         return json.dumps({
             "stdout": result.stdout,
             "stderr": result.stderr,
-            "returncode": result.returncode
+            "returncode": result.returncode,
+            "timed_out": result.timed_out,
+            "truncated": result.truncated
         }, indent=3)
     
     async def generate_plan(self, task:str, reasoning_effort:str, model:str) -> str:
@@ -306,6 +533,8 @@ class Engine:
 
         AVAILABLE TOOLS FOR EXECUTION:
         - read_file: Read file contents
+        - read_files: Read several files, globs or line ranges at once
+        - retrieve_context: Find the relevant snippets of the workspace for a query
         - create_file: Create/overwrite files
         - edit_file: Modify existing files (use llm to edit/change the file)
         - apply_regex: Apply regex to files (fast editing)
@@ -317,12 +546,17 @@ class Engine:
         PLAN OUTPUT FORMAT:
         - generate a set of steps to complete the task
         - each step must be described by:
+        - id: a short unique identifier for the step (s1, s2, ...)
         - title: a short title for the step
-        - description: a detailed description of the step
+        - description: a detailed, self-contained description of the step (it may be executed by a separate agent)
         - priority: the priority of the step (high, medium, low)
+        - depends_on: ids of the steps that must be completed before this one, keep it minimal so that independent steps can run in parallel
         """
 
-        response = await self.openai_client.chat.completions.parse(
+        model = self.router.route(
+            RoutingContext(call_kind=CallKind.GENERATE_PLAN, requested_model=model, internal_state=self.internal_state, prompt_size=len(task))
+        )
+        response = await self.client_manager.parse(
             model=model,
             messages=[
                 {
@@ -336,9 +570,37 @@ class Engine:
             ],
             max_completion_tokens=100_000,
             reasoning_effort=reasoning_effort,
+            response_format=Plan
         )
 
-        return response.choices[0].message.content
+        message = response.choices[0].message
+        if message.refusal is not None:
+            return json.dumps({"refusal": message.refusal}, indent=3)
+        plan = message.parsed
+        if plan is None:
+            raise ValueError(f"No plan was generated (finish reason: {response.choices[0].finish_reason})")
+        plan_id = f"plan_{len(self.plans) + 1}"
+        self.plans[plan_id] = plan
+        return json.dumps({"plan_id": plan_id, **plan.model_dump()}, indent=3)
+
+    async def execute_plan(self, plan_id:str, max_concurrency:int=4) -> str:
+        if plan_id not in self.plans:
+            raise ValueError(f"Unknown plan {plan_id}, call generate_plan first")
+        if self.depth > 0:
+            raise RuntimeError("execute_plan is not available to plan steps, run the work of this step directly")
+        if self.cassette is not None and self.cassette.mode == CassetteMode.REPLAY:
+            # child agents run concurrently and are not recorded, replaying them would call the model live
+            raise RuntimeError("execute_plan cannot run during a replay, use --replay_tools stub")
+        # the value comes from the model: 0 would block every step forever, a negative one breaks the semaphore
+        max_concurrency = min(max(int(max_concurrency), 1), self.max_plan_concurrency)
+        start = time.monotonic()
+        results = await PlanExecutor(self, max_concurrency=max_concurrency).run(self.plans[plan_id])
+        return json.dumps({
+            "plan_id": plan_id,
+            "elapsed": round(time.monotonic() - start, 2),
+            "sum_of_steps": round(sum(result.duration for result in results), 2),
+            "steps": [result.model_dump() for result in results]
+        }, indent=3)
     
     async def apply_regex(
         self,
@@ -0,0 +1,277 @@
+import asyncio
+import os
+import resource
+import signal
+import subprocess
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Tuple, Self
+
+from pydantic import BaseModel
+
+from pandora.log import logger
+
+class ExecutionLimits(BaseModel):
+    cpu_seconds:Optional[int] = 600
+    memory_bytes:Optional[int] = None  # RLIMIT_AS, breaks runtimes reserving large address spaces (node, jvm): prefer the cgroup limit
+    file_size_bytes:Optional[int] = 2 * 1024 ** 3
+    open_files:Optional[int] = 1024
+    nice:int = 10
+    max_output_bytes:int = 1024 ** 2  # per stream, the rest is drained and discarded
+    cgroup_root:Optional[str] = None  # writable cgroup v2 directory, e.g. /sys/fs/cgroup/pandora
+    cgroup_cpu_quota:float = 1.0  # number of cpus
+    cgroup_memory_bytes:Optional[int] = 4 * 1024 ** 3
+
+class ExecutionResult(BaseModel):
+    stdout:str
+    stderr:str
+    returncode:int
+    timed_out:bool = False
+    truncated:bool = False
+    output_bytes_dropped:int = 0
+    wall_time:float = 0.0
+    cpu_time:float = 0.0
+    max_rss_kb:int = 0
+
+class SessionUsage(BaseModel):
+    commands:int = 0
+    queued:int = 0
+    running:int = 0
+    timeouts:int = 0
+    wall_time:float = 0.0
+    cpu_time:float = 0.0
+    max_rss_kb:int = 0
+    output_bytes_dropped:int = 0
+
+class CappedReader(threading.Thread):
+    def __init__(self, stream, max_bytes:int):
+        super().__init__(daemon=True)
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.chunks:List[bytes] = []
+        self.size = 0
+        self.dropped = 0
+
+    def run(self) -> None:
+        # keep reading past the cap so that the child never blocks on a full pipe
+        for chunk in iter(lambda: self.stream.read1(65536), b""):
+            remaining = self.max_bytes - self.size
+            if remaining > 0:
+                self.chunks.append(chunk[:remaining])
+                self.size += min(len(chunk), remaining)
+            self.dropped += max(0, len(chunk) - max(remaining, 0))
+        self.stream.close()
+
+    def text(self) -> str:
+        return b"".join(self.chunks).decode(errors="replace")
+
+class ExecutionPool:
+    """
+    runs shell commands of every session on a fixed number of workers.
+    jobs are queued per session and picked round robin so that a session flooding
+    the pool only delays itself. each command runs in its own process group with
+    rlimits, a nice level, capped output and optionally a per-session cgroup.
+    """
+    _instance:Optional["ExecutionPool"] = None
+
+    def __init__(self, max_workers:int=4, limits:Optional[ExecutionLimits]=None):
+        self.max_workers = max_workers
+        self.limits = limits or ExecutionLimits()
+        self.queues:Dict[str, Deque[Tuple[str, float, asyncio.Future]]] = defaultdict(deque)
+        self.ready_sessions:Deque[str] = deque()
+        self.usage_by_session:Dict[str, SessionUsage] = defaultdict(SessionUsage)
+        self.thread_pool:Optional[ThreadPoolExecutor] = None
+        self.workers:List[asyncio.Task] = []
+        self.condition:Optional[asyncio.Condition] = None
+
+    @classmethod
+    def get_instance(cls, **kwargs) -> Self:
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    async def __aenter__(self) -> Self:
+        self._ensure_started()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown(wait=False, cancel_futures=True)
+            self.thread_pool = None
+
+    def _ensure_started(self) -> None:
+        if len(self.workers) > 0 and not all(worker.done() for worker in self.workers):
+            return
+        # the condition has to be created inside the running loop
+        self.condition = asyncio.Condition()
+        self.thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pandora-exec")
+        # capped readers run on their own threads, the pool threads only wait for the process
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    def _cgroup_path(self, session_id:str) -> Optional[str]:
+        if self.limits.cgroup_root is None:
+            return None
+        cgroup_path = os.path.join(self.limits.cgroup_root, f"session-{session_id}")
+        if os.path.isdir(cgroup_path):
+            return cgroup_path
+        try:
+            os.makedirs(cgroup_path, exist_ok=True)
+            period = 100_000
+            with open(os.path.join(cgroup_path, "cpu.max"), "w") as file_pointer:
+                file_pointer.write(f"{int(self.limits.cgroup_cpu_quota * period)} {period}")
+            if self.limits.cgroup_memory_bytes is not None:
+                with open(os.path.join(cgroup_path, "memory.max"), "w") as file_pointer:
+                    file_pointer.write(str(self.limits.cgroup_memory_bytes))
+        except OSError as e:
+            logger.warning(f"cgroup {cgroup_path} unavailable, falling back to rlimits only: {e}")
+            return None
+        return cgroup_path
+
+    def _apply_limits(self, pid:int, cgroup_path:Optional[str]) -> None:
+        # applied from the parent while the child is stopped: no python code runs between fork and exec
+        limits = self.limits
+        for rlimit, value in (
+            (resource.RLIMIT_CPU, limits.cpu_seconds),
+            (resource.RLIMIT_AS, limits.memory_bytes),
+            (resource.RLIMIT_FSIZE, limits.file_size_bytes),
+            (resource.RLIMIT_NOFILE, limits.open_files),
+        ):
+            if value is not None:
+                _, hard = resource.prlimit(pid, rlimit)
+                if hard != resource.RLIM_INFINITY:
+                    value = min(value, hard)
+                resource.prlimit(pid, rlimit, (value, hard))
+        os.setpriority(os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, pid) + limits.nice)
+        if cgroup_path is not None:
+            with open(os.path.join(cgroup_path, "cgroup.procs"), "w") as file_pointer:
+                file_pointer.write(str(pid))
+
+    def _execute(self, command:str, timeout:float, cgroup_path:Optional[str]) -> ExecutionResult:
+        start = time.monotonic()
+        # the shell stops itself before running the command, limits are set, then it is resumed
+        process = subprocess.Popen(
+            ["/bin/sh", "-c", 'kill -STOP $$ && exec /bin/sh -c "$0"', command],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True  # own process group: a timeout kills the whole tree
+        )
+        _, status = os.waitpid(process.pid, os.WUNTRACED)
+        if not os.WIFSTOPPED(status):
+            process.returncode = os.waitstatus_to_exitcode(status)
+            process.stdout.close()
+            process.stderr.close()
+            raise RuntimeError(f"shell exited before running the command ({process.returncode})")
+        try:
+            self._apply_limits(process.pid, cgroup_path)
+        except OSError:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.returncode = os.waitstatus_to_exitcode(os.waitpid(process.pid, 0)[1])
+            process.stdout.close()
+            process.stderr.close()
+            raise
+        os.kill(process.pid, signal.SIGCONT)
+        stdout_reader = CappedReader(process.stdout, self.limits.max_output_bytes)
+        stderr_reader = CappedReader(process.stderr, self.limits.max_output_bytes)
+        stdout_reader.start()
+        stderr_reader.start()
+
+        deadline = start + timeout
+        timed_out = False
+        while True:
+            pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+            if pid != 0:
+                break
+            if time.monotonic() > deadline:
+                timed_out = True
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                pid, status, rusage = os.wait4(process.pid, 0)
+                break
+            time.sleep(0.01)
+        process.returncode = os.waitstatus_to_exitcode(status)  # reaped here, keep Popen consistent
+
+        for reader in (stdout_reader, stderr_reader):
+            reader.join(timeout=max(0.0, deadline - time.monotonic()))
+        if stdout_reader.is_alive() or stderr_reader.is_alive():
+            # background children still hold the pipes open past the deadline
+            timed_out = True
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            stdout_reader.join()
+            stderr_reader.join()
+
+        return ExecutionResult(
+            stdout=stdout_reader.text(),
+            stderr=stderr_reader.text(),
+            returncode=process.returncode,
+            timed_out=timed_out,
+            truncated=stdout_reader.dropped + stderr_reader.dropped > 0,
+            output_bytes_dropped=stdout_reader.dropped + stderr_reader.dropped,
+            wall_time=time.monotonic() - start,
+            cpu_time=rusage.ru_utime + rusage.ru_stime,
+            max_rss_kb=rusage.ru_maxrss
+        )
+
+    async def _next_job(self) -> Tuple[str, str, float, asyncio.Future]:
+        async with self.condition:
+            await self.condition.wait_for(lambda: len(self.ready_sessions) > 0)
+            session_id = self.ready_sessions.popleft()
+            command, timeout, future = self.queues[session_id].popleft()
+            if self.queues[session_id]:
+                self.ready_sessions.append(session_id)  # back of the line: fair share across sessions
+            else:
+                del self.queues[session_id]
+            return session_id, command, timeout, future
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            session_id, command, timeout, future = await self._next_job()
+            usage = self.usage_by_session[session_id]
+            usage.queued -= 1
+            if future.cancelled():
+                continue
+            usage.running += 1
+            try:
+                cgroup_path = self._cgroup_path(session_id)
+                result = await loop.run_in_executor(self.thread_pool, self._execute, command, timeout, cgroup_path)
+                usage.commands += 1
+                usage.timeouts += int(result.timed_out)
+                usage.wall_time += result.wall_time
+                usage.cpu_time += result.cpu_time
+                usage.max_rss_kb = max(usage.max_rss_kb, result.max_rss_kb)
+                usage.output_bytes_dropped += result.output_bytes_dropped
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                usage.running -= 1
+
+    async def run(self, session_id:str, command:str, timeout:float) -> ExecutionResult:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        async with self.condition:
+            if session_id not in self.queues:
+                self.ready_sessions.append(session_id)
+            self.queues[session_id].append((command, timeout, future))
+            self.usage_by_session[session_id].queued += 1
+            self.condition.notify()
+        return await future
+
+    def usage(self, session_id:Optional[str]=None) -> Dict[str, SessionUsage]:
+        if session_id is not None:
+            return {session_id: self.usage_by_session[session_id]}
+        return dict(self.usage_by_session)
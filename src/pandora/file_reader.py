@@ -0,0 +1,157 @@
+import asyncio
+import glob
+from os import path, stat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+class ReadSpec(BaseModel):
+    path:str  # file path or glob pattern (** is recursive)
+    start_line:Optional[int] = None  # 1-based, inclusive
+    end_line:Optional[int] = None
+
+class FileSlice(BaseModel):
+    path:str
+    content:str = ""
+    start_line:int = 1
+    end_line:int = 0
+    truncated:bool = False
+    size:int = 0  # bytes read, counted against the budget
+    error:Optional[str] = None
+
+class FileReader:
+    """
+    batched reads for the read_files tool : globs are expanded, the byte budget is split
+    across files in request order from their sizes, then every file is read concurrently
+    on a thread pool, each read stopping at its line range or its share of the budget.
+    bytes left unused by ranged reads are then handed to the truncated files.
+    """
+    def __init__(self, max_workers:int=8, max_files:int=64):
+        self.max_workers = max_workers
+        self.max_files = max_files
+        self.thread_pool:Optional[ThreadPoolExecutor] = None
+
+    def _expand(self, specs:List[ReadSpec]) -> Tuple[List[Tuple[ReadSpec, str]], List[str]]:
+        targets, seen, missing = [], set(), []
+        for spec in specs:
+            if glob.has_magic(spec.path):
+                matches = [match for match in sorted(glob.glob(spec.path, recursive=True)) if path.isfile(match)]
+            else:
+                matches = [spec.path]
+            if len(matches) == 0:
+                missing.append(spec.path)
+            for match in matches:
+                key = (path.abspath(match), spec.start_line, spec.end_line)
+                if key not in seen:
+                    seen.add(key)
+                    targets.append((spec, match))
+        return targets, missing
+
+    def _read(self, spec:ReadSpec, file_path:str, max_bytes:int) -> FileSlice:
+        start_line = max(spec.start_line or 1, 1)
+        end_line = spec.end_line
+        lines, size, line_number, truncated = [], 0, 0, False
+        try:
+            with open(file_path, "rb") as file:
+                if b"\0" in file.read(1024):
+                    return FileSlice(path=file_path, error="binary file")
+                file.seek(0)
+                for line_number, line in enumerate(file, start=1):
+                    if line_number < start_line:
+                        continue
+                    if end_line is not None and line_number > end_line:
+                        line_number -= 1
+                        break
+                    if size + len(line) > max_bytes:
+                        truncated = True
+                        line_number -= 1
+                        break
+                    lines.append(line)
+                    size += len(line)
+        except OSError as e:
+            return FileSlice(path=file_path, error=str(e))
+        return FileSlice(
+            path=file_path,
+            content=b"".join(lines).decode(errors="replace"),
+            start_line=start_line,
+            end_line=line_number,
+            truncated=truncated,
+            size=size
+        )
+
+    async def read(self, specs:List[ReadSpec], max_bytes:int) -> Tuple[List[FileSlice], List[str]]:
+        if self.thread_pool is None:
+            self.thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pandora-read")
+        loop = asyncio.get_running_loop()
+        targets, missing = await loop.run_in_executor(self.thread_pool, self._expand, specs)
+        if len(targets) > self.max_files:
+            missing.extend(f"{file_path} (over the {self.max_files} files limit)" for _, file_path in targets[self.max_files:])
+            targets = targets[:self.max_files]
+
+        # file sizes are an upper bound of what a read returns, a ranged read leaves its unused share behind
+        sizes = await asyncio.gather(*[loop.run_in_executor(self.thread_pool, self._size, file_path) for _, file_path in targets])
+        budget, shares = max_bytes, []
+        for size in sizes:
+            share = min(size, budget)
+            shares.append(share)
+            budget -= share
+
+        slices = list(await asyncio.gather(*[
+            loop.run_in_executor(self.thread_pool, self._read, spec, file_path, share)
+            for (spec, file_path), share in zip(targets, shares)
+        ]))
+
+        # give what ranged reads left unused back to the truncated files, in request order
+        while True:
+            used = sum(file_slice.size for file_slice in slices)
+            budget, extended = max_bytes - used, {}
+            for index, file_slice in enumerate(slices):
+                if budget <= 0:
+                    break
+                if file_slice.truncated:
+                    extra = min(budget, sizes[index] - file_slice.size)
+                    budget -= extra
+                    extended[index] = file_slice.size + extra
+            if len(extended) == 0:
+                break
+            rereads = await asyncio.gather(*[
+                loop.run_in_executor(self.thread_pool, self._read, *targets[index], share)
+                for index, share in extended.items()
+            ])
+            for index, file_slice in zip(extended, rereads):
+                slices[index] = file_slice
+            if sum(file_slice.size for file_slice in slices) == used:
+                break  # the next line of every truncated file is larger than what is left
+        return slices, missing
+
+    @staticmethod
+    def _size(file_path:str) -> int:
+        try:
+            return stat(file_path).st_size
+        except OSError:
+            return 0
+
+    def close(self) -> None:
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown(wait=False, cancel_futures=True)
+            self.thread_pool = None
+
+def render_slices(slices:List[FileSlice], missing:List[str]) -> str:
+    parts = []
+    for file_slice in slices:
+        if file_slice.error is not None:
+            parts.append(f"=== {file_slice.path} [error: {file_slice.error}] ===\n")
+            continue
+        header = f"=== {file_slice.path} [lines {file_slice.start_line}-{file_slice.end_line}"
+        if file_slice.truncated:
+            header += ", truncated: byte budget exhausted"
+        parts.append(f"{header}] ===\n{file_slice.content}")
+        if file_slice.content and not file_slice.content.endswith("\n"):
+            parts.append("\n")
+    if missing:
+        parts.append(f"=== not found: {', '.join(missing)} ===\n")
+    return "".join(parts)
+
+def parse_specs(files:List[Union[str, Dict[str, Any]]]) -> List[ReadSpec]:
+    return [ReadSpec(path=item) if isinstance(item, str) else ReadSpec(**item) for item in files]
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from pandora.log import logger
+from pandora.client_manager import ClientManager
+
+def percentile(samples:List[float], q:float) -> float:
+    if len(samples) == 0:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+class HedgingPolicy(BaseModel):
+    enabled:bool = False
+    percentile:float = 0.95  # fire the hedge once the primary is slower than this ttft percentile
+    min_samples:int = 20
+    initial_threshold:float = 8.0  # seconds, used until min_samples ttft have been observed
+    min_threshold:float = 1.0
+    window:int = 500
+    fallback_model:Optional[str] = None  # None => hedge on the same model
+    probe_timeout:float = 60.0  # how long a losing primary is kept open to measure its ttft
+    report_every:int = 50
+
+class HedgingStats:
+    def __init__(self, window:int):
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.primary_ttft:Deque[float] = deque(maxlen=window)  # ttft without hedging, losing primaries included
+        self.effective_ttft:Deque[float] = deque(maxlen=window)
+
+    def summary(self) -> Dict[str, Any]:
+        unhedged_p99 = percentile(list(self.primary_ttft), 0.99)
+        hedged_p99 = percentile(list(self.effective_ttft), 0.99)
+        return {
+            "requests": self.requests,
+            "hedge_rate": self.hedges / max(1, self.requests),
+            "hedge_wins": self.hedge_wins,
+            "unhedged_ttft_p99": round(unhedged_p99, 3),
+            "hedged_ttft_p99": round(hedged_p99, 3),
+            "p99_improvement": round(unhedged_p99 - hedged_p99, 3)
+        }
+
+class RequestHedger:
+    def __init__(self, policy:HedgingPolicy, client_manager:ClientManager, fallback_client_manager:Optional[ClientManager]=None):
+        self.policy = policy
+        self.client_manager = client_manager
+        self.fallback_client_manager = fallback_client_manager or client_manager
+        self.stats = HedgingStats(policy.window)
+        self.probes:Set[asyncio.Task] = set()
+
+    def threshold(self) -> float:
+        if len(self.stats.primary_ttft) < self.policy.min_samples:
+            return self.policy.initial_threshold
+        return max(self.policy.min_threshold, percentile(list(self.stats.primary_ttft), self.policy.percentile))
+
+    async def _open(self, client_manager:ClientManager, kwargs:Dict[str, Any]) -> Tuple[Any, Any]:
+        stream = await client_manager.create(**kwargs)
+        try:
+            first_chunk = await stream.__anext__()
+        except BaseException:
+            await stream.close()
+            raise
+        return stream, first_chunk
+
+    async def _chain(self, stream:Any, first_chunk:Any) -> AsyncIterator[Any]:
+        try:
+            yield first_chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.close()
+
+    async def _discard(self, task:asyncio.Task) -> None:
+        if not task.done():
+            task.cancel()
+        try:
+            stream, _ = await task
+            await stream.close()
+        except BaseException:
+            pass
+
+    async def _probe(self, primary_task:asyncio.Task, start:float) -> None:
+        # the hedge answered first: let the primary reach its first token so that the
+        # unhedged distribution (and the threshold derived from it) is not censored by the hedge
+        remaining = self.policy.probe_timeout - (time.monotonic() - start)
+        done, _ = await asyncio.wait({primary_task}, timeout=max(0.0, remaining))
+        if primary_task not in done or (not primary_task.cancelled() and primary_task.exception() is None):
+            self.stats.primary_ttft.append(time.monotonic() - start)  # censored at probe_timeout when still pending
+        await self._discard(primary_task)
+
+    def _report(self) -> None:
+        if self.stats.requests % self.policy.report_every == 0:
+            logger.info(f"hedging stats: {self.stats.summary()}")
+
+    async def create(self, **kwargs) -> AsyncIterator[Any]:
+        self.stats.requests += 1
+        start = time.monotonic()
+        primary_task = asyncio.create_task(self._open(self.client_manager, kwargs))
+        done, _ = await asyncio.wait({primary_task}, timeout=self.threshold())
+        if primary_task in done:
+            stream, first_chunk = primary_task.result()  # errors are propagated to the caller as without hedging
+            ttft = time.monotonic() - start
+            self.stats.primary_ttft.append(ttft)
+            self.stats.effective_ttft.append(ttft)
+            self._report()
+            return self._chain(stream, first_chunk)
+
+        self.stats.hedges += 1
+        hedge_kwargs = {**kwargs, "model": self.policy.fallback_model or kwargs["model"]}
+        logger.info(f"no first token after {time.monotonic() - start:.2f}s, hedging on {hedge_kwargs['model']}")
+        hedge_task = asyncio.create_task(self._open(self.fallback_client_manager, hedge_kwargs))
+
+        pending = {primary_task, hedge_task}
+        first_error:Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        first_error = first_error or task.exception()
+                        continue
+                    winner = task
+                    ttft = time.monotonic() - start
+                    self.stats.effective_ttft.append(ttft)
+                    if winner is hedge_task:
+                        self.stats.hedge_wins += 1
+                        probe = asyncio.create_task(self._probe(primary_task, start))
+                        self.probes.add(probe)
+                        probe.add_done_callback(self.probes.discard)
+                    else:
+                        self.stats.primary_ttft.append(ttft)
+                        await self._discard(hedge_task)
+                    self._report()
+                    stream, first_chunk = winner.result()
+                    return self._chain(stream, first_chunk)
+        except asyncio.CancelledError:
+            await self._discard(primary_task)
+            await self._discard(hedge_task)
+            raise
+        raise first_error
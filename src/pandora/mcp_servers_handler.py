@@ -1,19 +1,17 @@
 import json 
 import asyncio 
-import zmq
-import zmq.asyncio
 from contextlib import asynccontextmanager, AsyncExitStack
 
 from enum import Enum
 from pydantic import BaseModel
 
-from typing import List, Dict, Tuple, Optional, Any, Self 
-
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from typing import List, Dict, Tuple, Optional, Any, Self, TYPE_CHECKING
 
 from pandora.log import logger
 
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
 class MCPConfig(BaseModel):
     command:str 
     args:Optional[List[str]] = None
@@ -35,6 +33,7 @@ class MCPHandler:
             self.mcp_servers_config = MCPServersConfig(mcpServers={})
         
     async def __aenter__(self) -> Self:
+        import zmq.asyncio  # deferred with mcp: only needed once the handler is entered
         self.mutex = asyncio.Lock()
         self.barrier : asyncio.Barrier = asyncio.Barrier(len(self.mcp_servers_config.mcpServers) + 1)
         self.ctx = zmq.asyncio.Context()
@@ -64,7 +63,7 @@ class MCPHandler:
         
         await self.barrier.wait()
         
-    async def _call_tool(self, client_session:ClientSession, name:str, arguments:Dict[str, Any]) -> Any:
+    async def _call_tool(self, client_session:"ClientSession", name:str, arguments:Dict[str, Any]) -> bytes:
         try:
             tool_call_result = await client_session.call_tool(
                 name=name,
@@ -80,9 +79,13 @@ class MCPHandler:
                 "status": "error",
                 "error": str(e)
             }
-        return response
+        return json.dumps(response).encode()
 
     async def mcp_worker(self, server_name:str, mcp_config:MCPConfig) -> None:
+        import zmq
+        from mcp import ClientSession, StdioServerParameters
+        from mcp.client.stdio import stdio_client
+
         logger.info(f"mcp worker {server_name} started")
         server_params = StdioServerParameters(
             command=mcp_config.command,
@@ -135,9 +138,9 @@ class MCPHandler:
                         client_socket_id, _, encoded_name, encoded_args = incoming_message
                         name = encoded_name.decode()
                         arguments = json.loads(encoded_args.decode())
-                        response = await self._call_tool(client_session, name, arguments)
-                        stringified_content = json.dumps(response)
-                        await router_socket.send_multipart([client_socket_id, b"", stringified_content.encode()])
+                        encoded_response = await self._call_tool(client_session, name, arguments)
+                        # the response (base64 images included) is handed to zmq without a copy
+                        await router_socket.send_multipart([client_socket_id, b"", encoded_response], copy=False)
                         logger.info(f"MCP server {server_name} sent a response")
                     except asyncio.CancelledError:
                         logger.warning(f"MCP server {server_name} cancelled")
@@ -153,13 +156,16 @@ class MCPHandler:
             await self.barrier.wait()  # do not block the main thread
             
     async def execute_tool(self, name:str, arguments:Dict[str, Any]) -> str:
+        import zmq
         _, server_name, tool_name = name.split("__")  # ignore the mcp__ prefix
         dealer_socket = self.ctx.socket(zmq.DEALER)
         dealer_socket.connect(f"inproc://mcp_server_{server_name}")
-        await dealer_socket.send_multipart([b"", tool_name.encode(), json.dumps(arguments).encode()])
-        _, encoded_response = await dealer_socket.recv_multipart()
-        dealer_socket.close(linger=0)
-        return encoded_response.decode()
+        try:
+            await dealer_socket.send_multipart([b"", tool_name.encode(), json.dumps(arguments).encode()])
+            _, frame = await dealer_socket.recv_multipart(copy=False)
+            return str(frame.buffer, "utf-8")  # decoded straight from the zmq message, no intermediate bytes
+        finally:
+            dealer_socket.close(linger=0)
 
 
 
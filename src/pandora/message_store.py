@@ -0,0 +1,88 @@
+import json
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from pandora.types import ChatMessage, Role
+
+class StoredMessage:
+    """
+    immutable chat message kept as its compact json encoding, computed once.
+    role and tool_call_id stay as attributes for the history scans, content and
+    tool_calls are decoded on access (only restore and tests read them back).
+    """
+    __slots__ = ("role", "tool_call_id", "_encoded")
+
+    def __init__(self, role:Union[Role, str], content:Optional[str]=None, tool_call_id:Optional[str]=None, tool_calls:Optional[List[Dict[str, Any]]]=None):
+        self.role = Role(role)
+        self.tool_call_id = tool_call_id
+        wire:Dict[str, Any] = {"role": self.role.value}
+        if content is not None:
+            wire["content"] = content
+        if tool_call_id is not None:
+            wire["tool_call_id"] = tool_call_id
+        if tool_calls is not None:
+            wire["tool_calls"] = tool_calls
+        self._encoded = json.dumps(wire, separators=(",", ":")).encode()
+
+    @classmethod
+    def from_message(cls, message:Union[ChatMessage, "StoredMessage"]) -> "StoredMessage":
+        if isinstance(message, StoredMessage):
+            return message
+        return cls(role=message.role, content=message.content, tool_call_id=message.tool_call_id, tool_calls=message.tool_calls)
+
+    @property
+    def content(self) -> Optional[str]:
+        return self.to_wire().get("content")
+
+    @property
+    def tool_calls(self) -> Optional[List[Dict[str, Any]]]:
+        return self.to_wire().get("tool_calls")
+
+    def to_wire(self) -> Dict[str, Any]:
+        return json.loads(self._encoded)
+
+    def encoded(self) -> bytes:
+        return self._encoded
+
+    def to_chat_message(self) -> ChatMessage:
+        return ChatMessage(**self.to_wire())
+
+class MessageStore:
+    """
+    append-only history of encoded fragments : the request body is the concatenation
+    of the cached fragments, so a turn never re-encodes the messages already sent.
+    """
+    __slots__ = ("messages", "size")
+
+    def __init__(self, messages:Optional[List[Union[ChatMessage, StoredMessage]]]=None):
+        self.messages:List[StoredMessage] = []
+        self.size = 0  # bytes of the encoded history
+        self.extend(messages or [])
+
+    def append(self, message:Union[ChatMessage, StoredMessage]) -> StoredMessage:
+        stored = StoredMessage.from_message(message)
+        self.messages.append(stored)
+        self.size += len(stored.encoded())
+        return stored
+
+    def extend(self, messages:List[Union[ChatMessage, StoredMessage]]) -> None:
+        for message in messages:
+            self.append(message)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __iter__(self) -> Iterator[StoredMessage]:
+        return iter(self.messages)
+
+    def __reversed__(self) -> Iterator[StoredMessage]:
+        return reversed(self.messages)
+
+    def __getitem__(self, index:int) -> StoredMessage:
+        return self.messages[index]
+
+    def wire_messages(self) -> List[Dict[str, Any]]:
+        return [message.to_wire() for message in self.messages]
+
+    def encode(self, *prefix:StoredMessage) -> bytes:
+        # the json array of messages sent in the request body, e.g. encode(system_message)
+        return b"[" + b",".join([message.encoded() for message in (*prefix, *self.messages)]) + b"]"
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from pandora.log import logger
+from pandora.types import Plan, PlanStep
+
+if TYPE_CHECKING:
+    from pandora.engine import Engine
+
+class StepResult(BaseModel):
+    id:str
+    title:str
+    status:str  # success, failed, skipped
+    result:Optional[str] = None
+    duration:float = 0.0
+
+class PlanExecutor:
+    def __init__(self, parent:"Engine", max_concurrency:int=4, max_turns:int=50):
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        self.parent = parent
+        self.max_concurrency = max_concurrency
+        self.max_turns = max_turns
+
+    def topological_order(self, plan:Plan) -> List[PlanStep]:
+        steps = {step.id: step for step in plan.steps}
+        if len(steps) != len(plan.steps):
+            raise ValueError("Plan contains duplicated step ids")
+        for step in plan.steps:
+            unknown = set(step.depends_on) - steps.keys()
+            if unknown:
+                raise ValueError(f"Step {step.id} depends on unknown steps: {sorted(unknown)}")
+
+        in_degree = {step.id: len(set(step.depends_on)) for step in plan.steps}
+        dependents:Dict[str, List[str]] = {step.id: [] for step in plan.steps}
+        for step in plan.steps:
+            for dependency in set(step.depends_on):
+                dependents[dependency].append(step.id)
+
+        ready = [step_id for step_id, degree in in_degree.items() if degree == 0]
+        order = []
+        while ready:
+            step_id = ready.pop(0)
+            order.append(steps[step_id])
+            for dependent in dependents[step_id]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(steps):
+            raise ValueError("Plan contains a dependency cycle")
+        return order
+
+    def _build_task(self, step:PlanStep, results:Dict[str, StepResult]) -> str:
+        sections = [f"You are executing one step of a larger plan.\n\nSTEP: {step.title}\n\n{step.description}"]
+        for dependency in step.depends_on:
+            sections.append(f"RESULT OF PREVIOUS STEP {results[dependency].title}:\n{results[dependency].result}")
+        sections.append("Only work on this step. End with print_message(reply) summarizing what was done.")
+        return "\n\n".join(sections)
+
+    async def run(self, plan:Plan) -> List[StepResult]:
+        order = self.topological_order(plan)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results:Dict[str, StepResult] = {}
+        tasks:Dict[str, asyncio.Task] = {}
+
+        async def run_step(step:PlanStep) -> None:
+            await asyncio.gather(*[tasks[dependency] for dependency in step.depends_on])
+            failed = [dependency for dependency in step.depends_on if results[dependency].status != "success"]
+            if failed:
+                results[step.id] = StepResult(id=step.id, title=step.title, status="skipped", result=f"dependencies failed: {failed}")
+                return
+            async with semaphore:
+                logger.info(f"plan step {step.id} ({step.title}) started")
+                start = time.monotonic()
+                child = self.parent.spawn_child()
+                try:
+                    result = await child.run_task(self._build_task(step, results), max_turns=self.max_turns)
+                    results[step.id] = StepResult(id=step.id, title=step.title, status="success", result=result, duration=time.monotonic() - start)
+                except Exception as e:
+                    logger.error(f"plan step {step.id} failed: {e}")
+                    results[step.id] = StepResult(id=step.id, title=step.title, status="failed", result=str(e), duration=time.monotonic() - start)
+                logger.info(f"plan step {step.id} finished in {results[step.id].duration:.2f}s")
+
+        # steps are scheduled in topological order so every dependency task exists before its dependents
+        for step in order:
+            tasks[step.id] = asyncio.create_task(run_step(step))
+        try:
+            await asyncio.gather(*tasks.values())
+        except asyncio.CancelledError:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return [results[step.id] for step in order]
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import sys
+from typing import Any, Dict, List, Optional, Self, TextIO, Tuple
+
+from pandora.log import logger
+
+def truncate(text:str, limit:int) -> str:
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more characters]"
+
+class Renderer:
+    """headless renderer : every call is a no-op so that the engine pays nothing for it"""
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+    def stream_delta(self, text:str) -> None:
+        pass
+
+    def end_stream(self) -> None:
+        pass
+
+    def tool_call(self, name:str, arguments:Dict[str, Any]) -> None:
+        pass
+
+    def tool_result(self, name:str, result:str) -> None:
+        pass
+
+    async def flush(self) -> None:
+        pass
+
+class ConsoleRenderer(Renderer):
+    """
+    console output decoupled from the engine : the engine only enqueues events,
+    a consumer task formats them and writes to the terminal from a worker thread.
+    stream deltas are coalesced into frames, large payloads are truncated and
+    events are dropped (then summarized) when the terminal cannot keep up.
+    print_message is the user facing channel : its message is written in full, as
+    plain text, and is never dropped.
+    """
+    USER_FACING_TOOLS = {"print_message"}
+
+    def __init__(self, max_queue_size:int=256, max_payload_size:int=2000, max_pending_delta:int=64_000, frame_interval:float=0.05, file:Optional[TextIO]=None):
+        self.max_queue_size = max_queue_size
+        self.max_payload_size = max_payload_size
+        self.max_pending_delta = max_pending_delta
+        self.frame_interval = frame_interval
+        self.file = file or sys.stdout
+
+        self.queue:Optional[asyncio.Queue] = None
+        self.consumer:Optional[asyncio.Task] = None
+        self.pending_delta:List[str] = []
+        self.pending_delta_size = 0
+        self.dropped_events = 0
+        self.dropped_characters = 0
+
+    async def __aenter__(self) -> Self:
+        self._ensure_started()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    def _ensure_started(self) -> None:
+        if self.consumer is None or self.consumer.done():
+            self.queue = asyncio.Queue()  # bounded by _put, user facing events must always fit
+            self.consumer = asyncio.create_task(self._consume())
+
+    def _put(self, event:Tuple[str, Any], droppable:bool=True) -> None:
+        self._ensure_started()
+        if droppable and self.queue.qsize() >= self.max_queue_size:
+            self.dropped_events += 1
+            return
+        self.queue.put_nowait(event)
+
+    def stream_delta(self, text:str) -> None:
+        if not text:
+            return
+        self._ensure_started()
+        self.pending_delta.append(text)
+        self.pending_delta_size += len(text)
+        while self.pending_delta_size > self.max_pending_delta and len(self.pending_delta) > 1:
+            dropped = self.pending_delta.pop(0)
+            self.pending_delta_size -= len(dropped)
+            self.dropped_characters += len(dropped)
+
+    def end_stream(self) -> None:
+        self._put(("end_stream", None))
+
+    def tool_call(self, name:str, arguments:Dict[str, Any]) -> None:
+        self._put(("tool_call", (name, arguments)), droppable=name not in self.USER_FACING_TOOLS)
+
+    def tool_result(self, name:str, result:str) -> None:
+        if name in self.USER_FACING_TOOLS:
+            return  # only echoes the message already written by tool_call
+        self._put(("tool_result", (name, result)))
+
+    def _take_frame(self) -> str:
+        frame = "".join(self.pending_delta)
+        self.pending_delta.clear()
+        self.pending_delta_size = 0
+        if self.dropped_characters > 0:
+            frame = f"[... {self.dropped_characters} streamed characters skipped]{frame}"
+            self.dropped_characters = 0
+        return frame
+
+    def _format(self, kind:str, payload:Any) -> str:
+        match kind:
+            case "end_stream":
+                return "\n"
+            case "tool_call":
+                name, arguments = payload
+                if name in self.USER_FACING_TOOLS:
+                    return f"{'=' * 50}\n{name} ({arguments.get('message_type', 'reply')})\n{'=' * 50}\n{arguments.get('message', '')}\n"
+                # truncate each value before dumping so that a whole file body is never formatted
+                arguments = {key: truncate(value, self.max_payload_size) if isinstance(value, str) else value for key, value in arguments.items()}
+                body = truncate(json.dumps(arguments, indent=3), self.max_payload_size)
+                return f"{'=' * 50}\n{name}\n{'=' * 50}\n{body}\n"
+            case "tool_result":
+                _, result = payload
+                return f"{truncate(str(result), self.max_payload_size)}\n"
+        return ""
+
+    def _write(self, text:str) -> None:
+        self.file.write(text)
+        self.file.flush()
+
+    async def _consume(self) -> None:
+        while True:
+            try:
+                kind, payload = await asyncio.wait_for(self.queue.get(), timeout=self.frame_interval)
+            except TimeoutError:
+                kind, payload = None, None
+            parts = [self._take_frame()]  # deltas received before the event are written first
+            if kind is not None:
+                parts.append(self._format(kind, payload))
+                # batch whatever else is already queued in the same write
+                while not self.queue.empty() and len(parts) < 64:
+                    next_kind, next_payload = self.queue.get_nowait()
+                    parts.append(self._format(next_kind, next_payload))
+                    self.queue.task_done()
+            if self.dropped_events > 0:
+                parts.append(f"[... {self.dropped_events} events dropped, output is lagging]\n")
+                self.dropped_events = 0
+            text = "".join(parts)
+            try:
+                if text:
+                    await asyncio.to_thread(self._write, text)
+            except Exception as e:
+                logger.error(f"renderer error: {e}")
+            finally:
+                if kind is not None:
+                    self.queue.task_done()
+
+    async def flush(self) -> None:
+        if self.consumer is None or self.consumer.done():
+            return
+        await self.queue.put(("flush", None))  # forces a frame with the pending deltas
+        await self.queue.join()
+
+    async def close(self) -> None:
+        if self.consumer is None:
+            return
+        await self.flush()
+        self.consumer.cancel()
+        await asyncio.gather(self.consumer, return_exceptions=True)
+        self.consumer = None
@@ -0,0 +1,102 @@
+from collections import defaultdict, deque
+from enum import Enum
+from typing import Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from pandora.log import logger
+
+class CallKind(str, Enum):
+    TURN = "turn"
+    EDIT_FILE = "edit_file"
+    SEARCH_THROUGH_WEB = "search_through_web"
+    GENERATE_PLAN = "generate_plan"
+
+class RoutingContext(BaseModel):
+    call_kind:CallKind
+    requested_model:str
+    internal_state:int = 0  # 0: interactive, 1: autonomous
+    prompt_size:int = 0  # characters
+    last_tools:List[str] = []
+    last_message_type:Optional[str] = None  # message_type of the last print_message call
+
+class RoutingHistory:
+    def __init__(self, window:int=50):
+        self.outcomes:Dict[Tuple[CallKind, str], Deque[bool]] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, call_kind:CallKind, model:str, success:bool) -> None:
+        self.outcomes[(call_kind, model)].append(success)
+
+    def success_rate(self, call_kind:CallKind, model:str) -> Optional[float]:
+        outcomes = self.outcomes.get((call_kind, model))
+        if not outcomes:
+            return None
+        return sum(outcomes) / len(outcomes)
+
+class RoutingPolicy:
+    def select(self, context:RoutingContext, history:RoutingHistory) -> str:
+        raise NotImplementedError
+
+class RuleBasedPolicy(RoutingPolicy):
+    """
+    opt-in downgrades : without a fast_model every call stays on the requested model.
+    the only turns sent to the fast model follow a turn made of print_message(notify/update)
+    calls with a small prompt, any other tool may precede real work (reads precede writes).
+    """
+    FAST_FOLLOW_UP_MESSAGE_TYPES = {"notify", "update"}
+
+    def __init__(
+        self,
+        flagship_model:str="gpt-4.1",
+        fast_model:Optional[str]=None,
+        max_fast_prompt_size:int=20_000,
+        max_fast_file_size:int=20_000,
+        min_success_rate:float=0.8
+        ):
+        self.flagship_model = flagship_model
+        self.fast_model = fast_model
+        self.max_fast_prompt_size = max_fast_prompt_size
+        self.max_fast_file_size = max_fast_file_size
+        self.min_success_rate = min_success_rate
+
+    def _fast_is_healthy(self, call_kind:CallKind, history:RoutingHistory) -> bool:
+        success_rate = history.success_rate(call_kind, self.fast_model)
+        return success_rate is None or success_rate >= self.min_success_rate
+
+    def select(self, context:RoutingContext, history:RoutingHistory) -> str:
+        if self.fast_model is None or self.fast_model == self.flagship_model:
+            return context.requested_model
+        if context.requested_model != self.flagship_model:
+            return context.requested_model  # never upgrade, never touch reasoning/search models
+        match context.call_kind:
+            case CallKind.TURN:
+                # interactive turns decide how to answer the user: keep them on the flagship
+                if context.internal_state == 0:
+                    return context.requested_model
+                if context.prompt_size > self.max_fast_prompt_size:
+                    return context.requested_model
+                if len(context.last_tools) == 0 or set(context.last_tools) != {"print_message"}:
+                    return context.requested_model
+                if context.last_message_type not in self.FAST_FOLLOW_UP_MESSAGE_TYPES:
+                    return context.requested_model
+            case CallKind.EDIT_FILE:
+                if context.prompt_size > self.max_fast_file_size:
+                    return context.requested_model
+            case _:
+                return context.requested_model
+        if not self._fast_is_healthy(context.call_kind, history):
+            return context.requested_model
+        return self.fast_model
+
+class ModelRouter:
+    def __init__(self, policy:Optional[RoutingPolicy]=None):
+        self.policy = policy or RuleBasedPolicy()
+        self.history = RoutingHistory()
+
+    def route(self, context:RoutingContext) -> str:
+        model = self.policy.select(context, self.history)
+        logger.info(f"route {context.call_kind.value} (state={context.internal_state}, prompt_size={context.prompt_size}, last_tools={context.last_tools}) : {context.requested_model} -> {model}")
+        return model
+
+    def record(self, call_kind:CallKind, model:str, success:bool) -> None:
+        self.history.record(call_kind, model, success)
@@ -0,0 +1,158 @@
+import json
+import time
+from os import path, makedirs, fsync
+from uuid import uuid4
+from typing import List, Optional, Tuple, Union, Self
+
+from pandora.log import logger
+from pandora.types import ChatMessage
+from pandora.message_store import MessageStore, StoredMessage
+
+class SessionStore:
+    """
+    append-only session log : one compact json record per message in <session_id>.jsonl
+    <session_id>.idx keeps the (seq, offset, internal_state) of every checkpoint, a checkpoint
+    is an fsync plus one index line so it stays O(1) whatever the length of the history.
+    """
+    def __init__(self, session_dir:str, session_id:Optional[str]=None, fsync_every:int=16, fsync_interval:float=1.0, checkpoint_every:int=256):
+        self.session_dir = session_dir
+        self.session_id = session_id or uuid4().hex
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.checkpoint_every = checkpoint_every
+
+        self.log_path = path.join(session_dir, f"{self.session_id}.jsonl")
+        self.index_path = path.join(session_dir, f"{self.session_id}.idx")
+
+        self.seq = 0
+        self.internal_state = 0
+        self.pending = 0
+        self.last_fsync = time.monotonic()
+        self.last_checkpoint_seq = 0
+        self.messages = MessageStore()
+        self.file_pointer = None
+
+    def __enter__(self) -> Self:
+        makedirs(self.session_dir, exist_ok=True)
+        self.messages, self.internal_state = self._load()
+        self.seq = len(self.messages)
+        self.file_pointer = open(self.log_path, "ab")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self.file_pointer is None:
+            return
+        self.checkpoint()
+        self.file_pointer.close()
+        self.file_pointer = None
+
+    def _read_checkpoints(self) -> List[Tuple[int, int]]:
+        if not path.exists(self.index_path):
+            return []
+        checkpoints = []
+        with open(self.index_path, "r") as file_pointer:
+            for line in file_pointer:
+                try:
+                    record = json.loads(line)
+                    checkpoints.append((record["seq"], record["offset"]))
+                except (json.JSONDecodeError, KeyError):
+                    break  # torn write at the end of the index
+        return checkpoints
+
+    def _load(self) -> Tuple[MessageStore, int]:
+        messages = MessageStore()
+        if not path.exists(self.log_path):
+            return messages, 0
+
+        # the whole history is needed in memory anyway: a single sequential pass over the log
+        internal_state, valid_offset = 0, 0
+        with open(self.log_path, "rb") as file_pointer:
+            for line in file_pointer:
+                if not line.endswith(b"\n"):
+                    break  # the process died in the middle of a write
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                messages.append(StoredMessage(**record["message"]))
+                internal_state = record["internal_state"]
+                valid_offset += len(line)
+
+        if valid_offset < path.getsize(self.log_path):
+            logger.warning(f"session {self.session_id}: dropping a torn record at offset {valid_offset}")
+            with open(self.log_path, "r+b") as file_pointer:
+                file_pointer.truncate(valid_offset)
+
+        checkpoints = self._read_checkpoints()
+        self.last_checkpoint_seq = checkpoints[-1][0] if checkpoints else 0
+        logger.info(f"session {self.session_id} resumed with {len(messages)} messages")
+        return messages, internal_state
+
+    def _sync(self, force:bool=False) -> None:
+        self.file_pointer.flush()
+        if force or self.pending >= self.fsync_every or time.monotonic() - self.last_fsync >= self.fsync_interval:
+            fsync(self.file_pointer.fileno())
+            self.pending = 0
+            self.last_fsync = time.monotonic()
+
+    def append(self, message:Union[ChatMessage, StoredMessage], internal_state:int) -> int:
+        stored = self.messages.append(message)
+        # the message fragment is encoded once and shared with the request body
+        self.file_pointer.write(b'{"seq":%d,"internal_state":%d,"message":%s}\n' % (self.seq, internal_state, stored.encoded()))
+        self.internal_state = internal_state
+        self.seq += 1
+        self.pending += 1
+        self._sync()
+        if self.seq - self.last_checkpoint_seq >= self.checkpoint_every:
+            self.checkpoint()
+        return self.seq
+
+    def extend(self, messages:List[Union[ChatMessage, StoredMessage]], internal_state:int) -> int:
+        for message in messages:
+            self.append(message, internal_state)
+        return self.seq
+
+    def checkpoint(self) -> int:
+        self._sync(force=True)
+        if self.seq == self.last_checkpoint_seq and path.exists(self.index_path):
+            return self.seq
+        with open(self.index_path, "a") as file_pointer:
+            file_pointer.write(json.dumps({"seq": self.seq, "offset": self.file_pointer.tell(), "internal_state": self.internal_state}) + "\n")
+        self.last_checkpoint_seq = self.seq
+        return self.seq
+
+    @classmethod
+    def fork(cls, session_dir:str, source_session_id:str, seq:Optional[int]=None, session_id:Optional[str]=None) -> Self:
+        source = cls(session_dir=session_dir, session_id=source_session_id)
+        if not path.exists(source.log_path):
+            raise FileNotFoundError(f"Session {source_session_id} does not exist in {session_dir}")
+
+        # seek to the closest checkpoint before seq, then scan forward to the exact record (to the end when seq is None)
+        offset, current_seq = 0, 0
+        for checkpoint_seq, checkpoint_offset in source._read_checkpoints():
+            if seq is not None and checkpoint_seq <= seq:
+                offset, current_seq = checkpoint_offset, checkpoint_seq
+
+        forked = cls(session_dir=session_dir, session_id=session_id)
+        with open(source.log_path, "rb") as source_pointer:
+            end = offset
+            source_pointer.seek(offset)
+            for line in source_pointer:
+                if (seq is not None and current_seq >= seq) or not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                current_seq += 1
+            source_pointer.seek(0)
+            with open(forked.log_path, "wb") as forked_pointer:
+                remaining = end
+                while remaining > 0:
+                    chunk = source_pointer.read(min(remaining, 1 << 20))
+                    if not chunk:
+                        break
+                    forked_pointer.write(chunk)
+                    remaining -= len(chunk)
+                forked_pointer.flush()
+                fsync(forked_pointer.fileno())
+
+        logger.info(f"session {forked.session_id} forked from {source_session_id} at seq {current_seq}")
+        return forked
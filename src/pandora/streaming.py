@@ -0,0 +1,192 @@
+import shutil
+import tempfile
+from os import path, makedirs, replace, remove, chmod, stat, umask
+from typing import Dict, List, Optional
+
+from pandora.log import logger
+
+def _target_mode(file_path:str) -> int:
+    # mkstemp creates 0600 files: keep the mode of the replaced file or use the one open() would give
+    if path.exists(file_path):
+        return stat(file_path).st_mode & 0o7777
+    current_umask = umask(0)
+    umask(current_umask)
+    return 0o666 & ~current_umask
+
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+class IncrementalJSONDecodeError(ValueError):
+    pass
+
+class IncrementalJSONStringDecoder:
+    """
+    incremental decoder for a flat json object with string values (the arguments of create_file).
+    the value of stream_key is emitted chunk by chunk as it arrives, other values are buffered.
+    """
+    def __init__(self, stream_key:str="content"):
+        self.stream_key = stream_key
+        self.values:Dict[str, str] = {}
+        self.state = "start"  # start, key, value, string, after_value, done
+        self.expect_key = True
+        self.current_key:Optional[str] = None
+        self.buffer:List[str] = []
+        self.escape:Optional[str] = None  # None, "\\" or the pending "\\uXXXX" sequence
+        self.high_surrogate:Optional[int] = None
+        self.stream_completed = False
+
+    def _emit(self, chars:str, output:List[str]) -> None:
+        if self.high_surrogate is not None:
+            raise IncrementalJSONDecodeError("unpaired high surrogate")
+        if self.current_key == self.stream_key and not self.expect_key:
+            output.append(chars)
+        else:
+            self.buffer.append(chars)
+
+    def _close_string(self) -> None:
+        if self.expect_key:
+            self.current_key = "".join(self.buffer)
+            self.state = "key"
+        else:
+            if self.current_key == self.stream_key:
+                self.stream_completed = True
+            else:
+                self.values[self.current_key] = "".join(self.buffer)
+            self.state = "after_value"
+        self.buffer = []
+
+    def _decode_unicode(self, sequence:str, output:List[str]) -> None:
+        code_point = int(sequence, 16)
+        if 0xD800 <= code_point <= 0xDBFF:
+            if self.high_surrogate is not None:
+                raise IncrementalJSONDecodeError("unpaired high surrogate")
+            self.high_surrogate = code_point
+            return
+        if 0xDC00 <= code_point <= 0xDFFF:
+            if self.high_surrogate is None:
+                raise IncrementalJSONDecodeError("unpaired low surrogate")
+            code_point = 0x10000 + ((self.high_surrogate - 0xD800) << 10) + (code_point - 0xDC00)
+            self.high_surrogate = None
+        self._emit(chr(code_point), output)
+
+    def feed(self, text:str) -> str:
+        output:List[str] = []
+        index, size = 0, len(text)
+        while index < size:
+            char = text[index]
+            if self.state == "string":
+                if self.escape is not None:
+                    if self.escape == "\\":
+                        if char == "u":
+                            self.escape = "\\u"
+                        elif char in ESCAPES:
+                            self.escape = None
+                            self._emit(ESCAPES[char], output)
+                        else:
+                            raise IncrementalJSONDecodeError(f"invalid escape \\{char}")
+                    else:
+                        self.escape += char
+                        if len(self.escape) == 6:
+                            sequence, self.escape = self.escape[2:], None
+                            self._decode_unicode(sequence, output)
+                    index += 1
+                    continue
+                # copy the longest run of plain characters at once
+                end = index
+                while end < size and text[end] not in '"\\':
+                    end += 1
+                if end > index:
+                    self._emit(text[index:end], output)
+                    index = end
+                    continue
+                if char == "\\":
+                    self.escape = "\\"
+                else:
+                    self._close_string()
+                index += 1
+                continue
+
+            if char in " \t\r\n":
+                index += 1
+                continue
+            match (self.state, char):
+                case ("start", "{"):
+                    self.state, self.expect_key = "value", True
+                case ("value", '"'):
+                    self.state = "string"
+                case ("value", "}") if self.expect_key and self.current_key is None:
+                    self.state = "done"  # empty object
+                case ("key", ":"):
+                    self.state, self.expect_key = "value", False
+                case ("after_value", ","):
+                    self.state, self.expect_key = "value", True
+                case ("after_value", "}"):
+                    self.state = "done"
+                case _:
+                    raise IncrementalJSONDecodeError(f"unexpected character {char!r} in state {self.state}")
+            index += 1
+        return "".join(output)
+
+    @property
+    def completed(self) -> bool:
+        return self.state == "done"
+
+class StreamingFileWriter:
+    def __init__(self, stream_key:str="content"):
+        self.decoder = IncrementalJSONStringDecoder(stream_key)
+        self.file_pointer = None
+        self.tmp_path:Optional[str] = None
+        self.length = 0
+        self.failed = False
+        self.committed = False
+
+    def _open(self) -> None:
+        # same directory as the target when it exists so that the final rename is atomic,
+        # directories are only created by commit once the call has been accepted
+        dir_path = path.dirname(self.decoder.values.get("file_path", "")) or None
+        if dir_path is not None and not path.isdir(dir_path):
+            dir_path = None
+        file_descriptor, self.tmp_path = tempfile.mkstemp(prefix=".pandora-", suffix=".tmp", dir=dir_path)
+        self.file_pointer = open(file_descriptor, "w")
+
+    def feed(self, arguments_delta:str) -> None:
+        if self.failed or self.committed:
+            return
+        try:
+            chunk = self.decoder.feed(arguments_delta)
+            if chunk:
+                if self.file_pointer is None:
+                    self._open()
+                self.file_pointer.write(chunk)
+                self.length += len(chunk)
+        except Exception as e:
+            logger.warning(f"streaming write aborted: {e}")
+            self.abort()
+            self.failed = True
+
+    def commit(self, file_path:str, content_length:int) -> bool:
+        if self.failed or not self.decoder.completed or not self.decoder.stream_completed or self.length != content_length:
+            self.abort()
+            return False
+        if self.file_pointer is None:
+            self._open()  # empty content
+        self.file_pointer.close()
+        self.file_pointer = None
+        dir_path = path.dirname(file_path)
+        if dir_path:
+            makedirs(dir_path, exist_ok=True)
+        chmod(self.tmp_path, _target_mode(file_path))
+        try:
+            replace(self.tmp_path, file_path)
+        except OSError:
+            shutil.move(self.tmp_path, file_path)  # temp file on another filesystem
+        self.tmp_path = None
+        self.committed = True
+        return True
+
+    def abort(self) -> None:
+        if self.file_pointer is not None:
+            self.file_pointer.close()
+            self.file_pointer = None
+        if self.tmp_path is not None and path.exists(self.tmp_path):
+            remove(self.tmp_path)
+        self.tmp_path = None
@@ -6,7 +6,7 @@ class SystemConfig(str, Enum):
 
     DEFINITIONS:
     - State Space: S = {s₁, s₂, ..., sₙ} where each sᵢ represents current agent state
-    - Core Action Space: Ω_core = {a₁, a₂, ..., a₈} where:
+    - Core Action Space: Ω_core = {a₁, a₂, ..., a₁₁} where:
     • a₁ = print_message(message, message_type)
     • a₂ = read_file(file_path) [text files only]
     • a₃ = create_file(file_path, content)
@@ -15,6 +15,9 @@ class SystemConfig(str, Enum):
     • a₆ = execute_bash(command, timeout) // install dependencies, execute scripts, etc...
     • a₇ = generate_plan(task, reasoning_effort, model)
     • a₈ = apply_regex(file_path, pattern, replacement, flags, count)
+    • a₉ = execute_plan(plan_id, max_concurrency) // run the independent steps of a generated plan in parallel
+    • a₁₀ = read_files(files, max_bytes) // several paths, globs or line ranges read concurrently, prefer it to repeated read_file
+    • a₁₁ = retrieve_context(query, top_k, path_glob) // ranked snippets of the local workspace, locate code before reading whole files
 
     - Extended Action Space: Ω = Ω_core ∪ Ω_mcp where:
     • Ω_mcp = {mcp__server__tool | server ∈ MCP_SERVERS, tool ∈ TOOLS(server)}
@@ -30,6 +33,7 @@ class SystemConfig(str, Enum):
     Let M: {reply, ask, confirm, analyze, notify, update, think} → {0, 1} be the control function where:
     - M(reply) = M(ask) = M(confirm) = 0 (trajectory ends, await user input)
     - M(think) = M(update) = M(notify) = M(analyze) = 1 (continue autonomous execution)
+    - In interactive mode (M = 0) only print_message is exposed, enter autonomous mode with print_message(think/update/notify/analyze) to access Ω \ {print_message}
 
     AGENT BEHAVIOR:
     For trajectory T starting with user query q:
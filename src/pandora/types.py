@@ -17,4 +17,14 @@ class ChatMessage(BaseModel):
     role:Role
     content:Optional[str] = None
     tool_call_id:Optional[str] = None
-    tool_calls:Optional[List[Dict[str, Any]]] = None
\ No newline at end of file
+    tool_calls:Optional[List[Dict[str, Any]]] = None
+
+class PlanStep(BaseModel):
+    id:str
+    title:str
+    description:str
+    priority:str
+    depends_on:List[str]
+
+class Plan(BaseModel):
+    steps:List[PlanStep]
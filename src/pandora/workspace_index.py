@@ -0,0 +1,394 @@
+import asyncio
+import json
+import math
+import re
+import time
+import zlib
+from array import array
+from collections import Counter
+from fnmatch import fnmatch
+from functools import lru_cache
+from hashlib import sha1
+from operator import mul
+from os import path, makedirs, replace, walk, stat
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel
+
+from pandora.log import logger
+
+SKIPPED_DIRS = {"node_modules", "__pycache__", "venv", "dist", "build", "site-packages"}  # hidden directories are skipped as well
+TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+SUBTOKEN_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+def tokenize(text:str) -> List[str]:
+    # identifiers are kept whole and split on snake_case / camelCase boundaries
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text):
+        tokens.append(word.lower())
+        parts = SUBTOKEN_PATTERN.findall(word)
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts)
+    return tokens
+
+@lru_cache(maxsize=1 << 16)
+def _feature(token:str, dimension:int) -> Tuple[int, float]:
+    # crc32 rather than hash(): the buckets must be stable across processes
+    digest = zlib.crc32(token.encode())
+    return digest % dimension, 1.0 if digest & 0x80000000 else -1.0
+
+class Snippet(BaseModel):
+    path:str
+    start_line:int
+    end_line:int
+    score:float
+    content:str
+
+class Embedder:
+    """maps texts to fixed size vectors, documents are expected to be l2 normalized"""
+    name = "embedder"
+    dimension = 0
+
+    def embed_documents(self, texts:List[str]) -> List[Sequence[float]]:
+        raise NotImplementedError
+
+    def embed_query(self, text:str) -> Sequence[float]:
+        return self.embed_documents([text])[0]
+
+    def add(self, vectors:List[Sequence[float]]) -> None:
+        pass  # corpus statistics hooks, called when chunks enter or leave the index
+
+    def remove(self, vectors:List[Sequence[float]]) -> None:
+        pass
+
+    def state(self) -> Dict[str, Any]:
+        return {}
+
+    def load_state(self, state:Dict[str, Any]) -> None:
+        pass
+
+class HashedTfidfEmbedder(Embedder):
+    """
+    dependency free fallback : sublinear term frequencies hashed into a fixed number of
+    signed buckets. document frequencies are tracked per bucket and applied as idf on
+    the query side, so adding or removing a file never re-embeds the others.
+    """
+    def __init__(self, dimension:int=1024):
+        self.name = f"hashed-tfidf-{dimension}"
+        self.dimension = dimension
+        self.document_frequencies = [0] * dimension
+        self.documents = 0
+
+    def _vector(self, text:str) -> List[float]:
+        vector = [0.0] * self.dimension
+        for token, count in Counter(tokenize(text)).items():
+            bucket, sign = _feature(token, self.dimension)
+            vector[bucket] += sign * (1.0 + math.log(count))
+        return vector
+
+    @staticmethod
+    def _normalize(vector:List[float]) -> List[float]:
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm > 0 else vector
+
+    def embed_documents(self, texts:List[str]) -> List[Sequence[float]]:
+        return [self._normalize(self._vector(text)) for text in texts]
+
+    def embed_query(self, text:str) -> Sequence[float]:
+        idf = [math.log((1 + self.documents) / (1 + frequency)) + 1.0 for frequency in self.document_frequencies]
+        return self._normalize([value * weight for value, weight in zip(self._vector(text), idf)])
+
+    def _count(self, vectors:List[Sequence[float]], delta:int) -> None:
+        for vector in vectors:
+            # rows read back from the memmap are numpy arrays, fresh embeddings are lists
+            buckets = vector.nonzero()[0] if hasattr(vector, "nonzero") else (bucket for bucket, value in enumerate(vector) if value != 0)
+            for bucket in buckets:
+                self.document_frequencies[bucket] += delta
+            self.documents += delta
+
+    def add(self, vectors:List[Sequence[float]]) -> None:
+        self._count(vectors, 1)
+
+    def remove(self, vectors:List[Sequence[float]]) -> None:
+        self._count(vectors, -1)
+
+    def state(self) -> Dict[str, Any]:
+        return {"document_frequencies": self.document_frequencies, "documents": self.documents}
+
+    def load_state(self, state:Dict[str, Any]) -> None:
+        self.document_frequencies = state["document_frequencies"]
+        self.documents = state["documents"]
+
+class SentenceTransformerEmbedder(Embedder):
+    """small local cpu model (sentence-transformers), loaded on first use"""
+    def __init__(self, model_name:str="all-MiniLM-L6-v2"):
+        self.name = f"sentence-transformers-{model_name}"
+        self.model_name = model_name
+        self.model = None
+
+    def _load(self):
+        if self.model is None:
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(self.model_name, device="cpu")
+        return self.model
+
+    @property
+    def dimension(self) -> int:
+        return self._load().get_sentence_embedding_dimension()
+
+    def embed_documents(self, texts:List[str]) -> List[Sequence[float]]:
+        return list(self._load().encode(texts, batch_size=32, normalize_embeddings=True))
+
+class ArrayVectorStore:
+    """
+    stdlib fallback : float32 rows kept in memory and written as a whole to <index_dir>/vectors.f32.
+    queries are pure python (about 0.1 ms per chunk), only meant for environments without numpy.
+    """
+    def __init__(self, file_path:str, dimension:int, rows:int):
+        self.file_path = file_path
+        self.dimension = dimension
+        self.vectors = array("f")
+        if rows > 0 and path.exists(file_path):
+            with open(file_path, "rb") as file_pointer:
+                self.vectors.fromfile(file_pointer, rows * dimension)
+        self.vectors.extend([0.0] * (rows * dimension - len(self.vectors)))
+
+    def write(self, row:int, vector:Sequence[float]) -> None:
+        offset = row * self.dimension
+        if offset >= len(self.vectors):
+            self.vectors.extend([0.0] * (offset + self.dimension - len(self.vectors)))
+        self.vectors[offset:offset + self.dimension] = array("f", vector)
+
+    def read(self, row:int) -> Sequence[float]:
+        offset = row * self.dimension
+        return self.vectors[offset:offset + self.dimension]
+
+    def ranked(self, query:Sequence[float], rows:int) -> Iterator[Tuple[int, float]]:
+        query = array("f", query)
+        scores = [sum(map(mul, self.read(row), query)) for row in range(rows)]
+        for row in sorted(range(rows), key=scores.__getitem__, reverse=True):
+            yield row, scores[row]
+
+    def flush(self) -> None:
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, "wb") as file_pointer:
+            self.vectors.tofile(file_pointer)
+        replace(tmp_path, self.file_path)
+
+class MemmapVectorStore(ArrayVectorStore):
+    """default store, same file layout memory mapped with numpy : a query is a single matrix-vector product"""
+    def __init__(self, file_path:str, dimension:int, rows:int):
+        self.file_path = file_path
+        self.dimension = dimension
+        self.capacity = 0
+        self.vectors = None
+        if not path.exists(file_path) or rows == 0:
+            open(file_path, "wb").close()
+        self._map(max(rows, 1024))
+
+    def _map(self, capacity:int) -> None:
+        import numpy as np
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        with open(self.file_path, "r+b") as file_pointer:
+            file_pointer.truncate(capacity * self.dimension * 4)  # grows with zeros, i.e. free rows
+        self.vectors = np.memmap(self.file_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        self.capacity = capacity
+
+    def write(self, row:int, vector:Sequence[float]) -> None:
+        if row >= self.capacity:
+            self._map(max(row + 1, self.capacity * 2))
+        self.vectors[row] = vector
+
+    def read(self, row:int) -> Sequence[float]:
+        return self.vectors[row]
+
+    def ranked(self, query:Sequence[float], rows:int) -> Iterator[Tuple[int, float]]:
+        import numpy as np
+        scores = self.vectors[:rows] @ np.asarray(query, dtype=np.float32)
+        for row in np.argsort(-scores):
+            yield int(row), float(scores[row])
+
+    def flush(self) -> None:
+        self.vectors.flush()
+
+class WorkspaceIndex:
+    """
+    local retrieval index of a workspace : text files are cut in overlapping line windows,
+    embedded and stored as float32 rows in a numpy memmap. files are
+    re-embedded only when their mtime or size change, rows of deleted chunks are reused.
+    """
+    VERSION = 1
+
+    def __init__(self, workspace_dir:str=".", index_dir:Optional[str]=None, embedder:Optional[Embedder]=None, store_class:Type[ArrayVectorStore]=MemmapVectorStore, chunk_lines:int=40, chunk_overlap:int=10, max_file_size:int=1024 ** 2, refresh_interval:float=2.0):
+        self.workspace_dir = path.abspath(workspace_dir)
+        self.index_dir = index_dir or path.join(path.expanduser("~/.cache/pandora/index"), sha1(self.workspace_dir.encode()).hexdigest()[:16])
+        self.embedder = embedder or HashedTfidfEmbedder()
+        self.store_class = store_class
+        self.chunk_lines = chunk_lines
+        self.chunk_overlap = chunk_overlap
+        self.max_file_size = max_file_size
+        self.refresh_interval = refresh_interval
+
+        self.meta_path = path.join(self.index_dir, "meta.json")
+        self.vectors_path = path.join(self.index_dir, "vectors.f32")
+        self.files:Dict[str, Tuple[float, int, List[int]]] = {}  # relative path -> (mtime, size, rows)
+        self.chunks:List[Optional[Tuple[str, int, int]]] = []  # row -> (relative path, start line, end line)
+        self.free_rows:List[int] = []
+        self.store:Optional[ArrayVectorStore] = None
+        self.last_refresh = 0.0
+        self.lock = asyncio.Lock()
+
+    def _settings(self) -> Dict[str, Any]:
+        return {"version": self.VERSION, "embedder": self.embedder.name, "dimension": self.embedder.dimension, "chunk_lines": self.chunk_lines, "chunk_overlap": self.chunk_overlap}
+
+    def _load(self) -> None:
+        makedirs(self.index_dir, exist_ok=True)
+        if path.exists(self.meta_path):
+            with open(self.meta_path, "r") as file_pointer:
+                meta = json.load(file_pointer)
+            if meta["settings"] == self._settings():
+                self.files = {key: (mtime, size, rows) for key, (mtime, size, rows) in meta["files"].items()}
+                self.chunks = [tuple(chunk) if chunk is not None else None for chunk in meta["chunks"]]
+                self.free_rows = meta["free_rows"]
+                self.embedder.load_state(meta["embedder_state"])
+            else:
+                logger.info(f"workspace index {self.index_dir}: settings changed, rebuilding")
+        self.store = self.store_class(self.vectors_path, self.embedder.dimension, len(self.chunks))
+
+    def _save(self) -> None:
+        self.store.flush()
+        meta = {
+            "settings": self._settings(),
+            "files": self.files,
+            "chunks": self.chunks,
+            "free_rows": self.free_rows,
+            "embedder_state": self.embedder.state()
+        }
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as file_pointer:
+            json.dump(meta, file_pointer, separators=(",", ":"))
+        replace(tmp_path, self.meta_path)
+
+    def _scan(self) -> Iterator[Tuple[str, float, int]]:
+        for dir_path, dir_names, file_names in walk(self.workspace_dir):
+            dir_names[:] = [name for name in dir_names if not name.startswith(".") and name not in SKIPPED_DIRS]
+            for file_name in file_names:
+                if file_name.startswith("."):
+                    continue
+                file_path = path.join(dir_path, file_name)
+                try:
+                    file_stat = stat(file_path)
+                except OSError:
+                    continue
+                if 0 < file_stat.st_size <= self.max_file_size:
+                    yield path.relpath(file_path, self.workspace_dir), file_stat.st_mtime, file_stat.st_size
+
+    def _chunk(self, text:str) -> Iterator[Tuple[int, int, str]]:
+        lines = text.splitlines(keepends=True)
+        step = max(self.chunk_lines - self.chunk_overlap, 1)
+        for start in range(0, len(lines), step):
+            window = lines[start:start + self.chunk_lines]
+            yield start + 1, start + len(window), "".join(window)
+            if start + self.chunk_lines >= len(lines):
+                break
+
+    def _remove(self, relative_path:str) -> None:
+        entry = self.files.pop(relative_path, None)
+        if entry is None or len(entry[2]) == 0:
+            return
+        rows = entry[2]
+        self.embedder.remove([self.store.read(row) for row in rows])
+        zeros = [0.0] * self.embedder.dimension
+        for row in rows:
+            self.store.write(row, zeros)
+            self.chunks[row] = None
+        self.free_rows.extend(rows)
+
+    def _add(self, relative_path:str, mtime:float, size:int) -> None:
+        try:
+            with open(path.join(self.workspace_dir, relative_path), "rb") as file_pointer:
+                content = file_pointer.read()
+        except OSError:
+            return
+        rows = []
+        if b"\0" not in content[:1024]:  # binary files are remembered with no rows so they are not retried
+            windows = list(self._chunk(content.decode(errors="replace")))
+            # the path is embedded with the chunk: file and module names are strong signals
+            vectors = self.embedder.embed_documents([f"{relative_path}\n{text}" for _, _, text in windows])
+            self.embedder.add(vectors)
+            for (start_line, end_line, _), vector in zip(windows, vectors):
+                if self.free_rows:
+                    row = self.free_rows.pop()
+                else:
+                    row = len(self.chunks)
+                    self.chunks.append(None)
+                self.store.write(row, vector)
+                self.chunks[row] = (relative_path, start_line, end_line)
+                rows.append(row)
+        self.files[relative_path] = (mtime, size, rows)
+
+    def refresh(self, force:bool=False) -> int:
+        if self.store is None:
+            self._load()
+        if not force and time.monotonic() - self.last_refresh < self.refresh_interval:
+            return 0
+        start = time.perf_counter()
+        seen, updated = set(), 0
+        for relative_path, mtime, size in self._scan():
+            seen.add(relative_path)
+            entry = self.files.get(relative_path)
+            if entry is not None and entry[0] == mtime and entry[1] == size:
+                continue
+            self._remove(relative_path)
+            self._add(relative_path, mtime, size)
+            updated += 1
+        for relative_path in [key for key in self.files if key not in seen]:
+            self._remove(relative_path)
+            updated += 1
+        if updated > 0:
+            self._save()
+            logger.info(f"workspace index: {updated} files updated in {time.perf_counter() - start:.2f}s ({len(self.chunks) - len(self.free_rows)} chunks)")
+        self.last_refresh = time.monotonic()
+        return updated
+
+    def search(self, query:str, top_k:int=8, path_glob:Optional[str]=None) -> List[Snippet]:
+        self.refresh()
+        hits = []
+        for row, score in self.store.ranked(self.embedder.embed_query(query), len(self.chunks)):
+            if len(hits) >= top_k or score <= 0:
+                break  # free rows are zero vectors, they never score above 0
+            chunk = self.chunks[row]
+            if chunk is None or (path_glob is not None and not fnmatch(chunk[0], path_glob)):
+                continue
+            hits.append((chunk, score))
+
+        snippets, lines_by_path = [], {}
+        for (relative_path, start_line, end_line), score in hits:
+            if relative_path not in lines_by_path:
+                try:
+                    with open(path.join(self.workspace_dir, relative_path), "rb") as file_pointer:
+                        lines_by_path[relative_path] = file_pointer.read().decode(errors="replace").splitlines(keepends=True)
+                except OSError:
+                    lines_by_path[relative_path] = []  # deleted since the last refresh
+            if len(lines_by_path[relative_path]) == 0:
+                continue
+            content = "".join(lines_by_path[relative_path][start_line - 1:end_line])
+            snippets.append(Snippet(path=relative_path, start_line=start_line, end_line=end_line, score=score, content=content))
+        return snippets
+
+    async def retrieve(self, query:str, top_k:int=8, path_glob:Optional[str]=None) -> List[Snippet]:
+        # indexing and scoring are cpu bound, keep them off the event loop
+        async with self.lock:
+            return await asyncio.to_thread(self.search, query, top_k, path_glob)
+
+def render_snippets(snippets:List[Snippet]) -> str:
+    if len(snippets) == 0:
+        return "no relevant snippet found, try other terms or read_files"
+    parts = []
+    for snippet in snippets:
+        parts.append(f"=== {snippet.path} [lines {snippet.start_line}-{snippet.end_line}, score {snippet.score:.3f}] ===\n{snippet.content}")
+        if not snippet.content.endswith("\n"):
+            parts.append("\n")
+    return "".join(parts)
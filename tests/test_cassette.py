@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from openai.types.chat import ChatCompletionChunk
+
+from pandora.cassette import Cassette, CassetteMode
+from pandora.engine import Engine
+from pandora.file_reader import FileReader
+from pandora.renderer import Renderer
+from pandora.workspace_index import WorkspaceIndex
+
+class StubMCPHandler:
+    def get_tools(self) -> list:
+        return []
+
+def chunk(content:str=None, tool_call:dict=None, finish_reason:str=None) -> dict:
+    delta = {"role": "assistant", "content": content}
+    if tool_call is not None:
+        delta["tool_calls"] = [{"index": 0, "type": "function", **tool_call}]
+    return {"t": 0.0, "chunk": ChatCompletionChunk(
+        id="chunk", created=0, model="gpt-4.1", object="chat.completion.chunk",
+        choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    ).model_dump(mode="json")}
+
+def tool_call_stream(tool_call_id:str, name:str, arguments:dict) -> dict:
+    return {"type": "stream", "chunks": [
+        chunk(tool_call={"id": tool_call_id, "function": {"name": name, "arguments": json.dumps(arguments)}}),
+        chunk(finish_reason="tool_calls")
+    ]}
+
+def replay(tmp_path, events:list) -> tuple:
+    path2cassette = tmp_path / "session.jsonl"
+    path2cassette.write_text("".join(json.dumps(event) + "\n" for event in events))
+    with Cassette(str(path2cassette), CassetteMode.REPLAY, speed=0) as cassette:
+        engine = Engine(
+            mcp_handler=StubMCPHandler(),
+            openai_api_key="sk-test",
+            cassette=cassette,
+            renderer=Renderer(),
+            file_reader=FileReader(),
+            workspace_index=WorkspaceIndex(str(tmp_path), index_dir=str(tmp_path / "index"))
+        )
+        asyncio.run(asyncio.wait_for(engine.loop(), timeout=10))
+    return engine, cassette
+
+def test_replay_goes_past_a_recorded_stream_error(tmp_path):
+    engine, cassette = replay(tmp_path, [
+        {"type": "query", "content": "hello"},
+        {"type": "stream", "chunks": [chunk(content="partial")], "error": "connection reset"},
+        {"type": "query", "content": "hello again"},
+        tool_call_stream("call_1", "print_message", {"message": "hi", "message_type": "reply"}),
+        {"type": "tool", "tool_call_id": "call_1", "name": "print_message", "result": "{}"},
+        {"type": "turn", "latency": 0.5},
+    ])
+    assert engine.last_message == "hi"
+    assert len(cassette.streams) == 0 and len(cassette.latencies) == 1
+
+def test_replay_stops_on_a_missing_tool_result(tmp_path):
+    engine, cassette = replay(tmp_path, [
+        {"type": "query", "content": "read it"},
+        tool_call_stream("call_1", "print_message", {"message": "reading", "message_type": "notify"}),
+        {"type": "tool", "tool_call_id": "call_1", "name": "print_message", "result": "{}"},
+        tool_call_stream("call_2", "read_file", {"file_path": "README.md"}),
+        {"type": "query", "content": "never asked"},
+        tool_call_stream("call_3", "print_message", {"message": "never printed"}),
+    ])
+    assert engine.last_message == "reading"
+    assert list(cassette.queries) == ["never asked"]
+
+def test_replay_stops_when_the_streams_run_out(tmp_path):
+    engine, cassette = replay(tmp_path, [
+        {"type": "query", "content": "hello"},
+        {"type": "query", "content": "never asked"},
+    ])
+    assert list(cassette.queries) == ["never asked"]
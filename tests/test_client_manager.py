@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from openai import APIStatusError, AsyncOpenAI
+
+from pandora.client_manager import ClientManager, TokenBucket
+
+COMPLETION = {
+    "id": "c", "object": "chat.completion", "created": 0, "model": "gpt-4.1",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}]
+}
+
+def make_client_manager(handler, **kwargs) -> ClientManager:
+    client_manager = ClientManager("sk-test", **kwargs)
+    client_manager.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client_manager.openai_client = AsyncOpenAI(api_key="sk-test", http_client=client_manager.http_client, max_retries=0)
+    return client_manager
+
+def test_token_bucket_waits_for_the_refill():
+    async def main():
+        bucket = TokenBucket(capacity=2, refill_per_second=20)
+        start = time.monotonic()
+        await bucket.acquire(1)
+        await bucket.acquire(1)
+        immediate = time.monotonic() - start
+        await bucket.acquire(1)
+        await bucket.acquire(100)  # larger than the capacity: waits for a full bucket instead of forever
+        return immediate, time.monotonic() - start
+    immediate, total = asyncio.run(main())
+    assert immediate < 0.02
+    assert 0.12 <= total < 0.5  # 1 token then 2 tokens at 20 per second
+
+def status_error(status_code:int, headers:dict) -> APIStatusError:
+    response = httpx.Response(status_code, headers=headers, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return APIStatusError("error", response=response, body=None)
+
+@pytest.mark.parametrize("headers, low, high", [
+    ({"retry-after-ms": "1500"}, 1.5, 1.5 + 0.1 * 4.0),
+    ({"retry-after": "3"}, 3.0, 3.0 + 0.1 * 4.0),
+    ({"retry-after": "120"}, 10.0, 10.0),  # capped by max_delay
+    ({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0, 4.0),  # unparsed: full jitter
+    ({}, 0.0, 4.0),
+])
+def test_retry_delay_honours_retry_after(headers, low, high):
+    client_manager = ClientManager("sk-test", base_delay=0.5, max_delay=10.0)
+    for _ in range(20):
+        assert low <= client_manager._retry_delay(3, status_error(429, headers)) <= high
+
+def test_429_is_retried_after_the_advertised_delay_and_blocks_the_limiter():
+    responses = [
+        httpx.Response(429, headers={"retry-after-ms": "200"}, json={"error": {"message": "slow down"}}),
+        httpx.Response(200, json=COMPLETION),
+    ]
+
+    async def main():
+        client_manager = make_client_manager(lambda request: responses.pop(0), base_delay=0.01)
+        start = time.monotonic()
+        response = await client_manager.create(model="gpt-4.1", messages=[{"role": "user", "content": "hi"}])
+        return response, time.monotonic() - start, client_manager.rate_limiter
+    response, elapsed, rate_limiter = asyncio.run(main())
+    assert response.choices[0].message.content == "ok" and responses == []
+    assert 0.2 <= elapsed < 1.0
+    assert 0 < rate_limiter.blocked_until <= time.monotonic()  # every caller waited, not only the retried one
+
+def test_non_retryable_errors_are_raised_at_once():
+    calls = []
+
+    def handler(request:httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(400, json={"error": {"message": "bad request"}})
+
+    async def main():
+        await make_client_manager(handler).create(model="gpt-4.1", messages=[])
+    with pytest.raises(APIStatusError):
+        asyncio.run(main())
+    assert len(calls) == 1
+
+def test_retries_stop_after_max_retries():
+    calls = []
+
+    def handler(request:httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(503, json={"error": {"message": "unavailable"}})
+
+    async def main():
+        await make_client_manager(handler, max_retries=2, base_delay=0.001).create(model="gpt-4.1", messages=[])
+    with pytest.raises(APIStatusError):
+        asyncio.run(main())
+    assert len(calls) == 3
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from pandora.execution_pool import ExecutionLimits, ExecutionPool
+
+def run(commands:list, limits:ExecutionLimits=None, max_workers:int=2) -> tuple:
+    async def main():
+        async with ExecutionPool(max_workers=max_workers, limits=limits) as pool:
+            completed = []
+
+            async def submit(session_id:str, command:str, timeout:float):
+                result = await pool.run(session_id, command, timeout)
+                completed.append((session_id, command))
+                return result
+            results = await asyncio.gather(*[submit(*command) for command in commands])
+            return results, completed, pool.usage()
+    return asyncio.run(main())
+
+def test_output_and_quoting():
+    (result,), _, _ = run([("s1", "printf '%s|' \"a b\" 'c\"d' $((1 + 2)); echo err >&2; exit 3", 5)])
+    assert (result.stdout, result.stderr, result.returncode, result.timed_out) == ('a b|c"d|3|', "err\n", 3, False)
+
+def test_timeout_kills_the_process_group():
+    start = time.monotonic()
+    (result,), _, usage = run([("s1", "sleep 30; echo never", 0.5)])
+    assert result.timed_out and result.stdout == "" and time.monotonic() - start < 5
+    assert usage["s1"].timeouts == 1
+
+def test_background_children_past_the_deadline_count_as_a_timeout():
+    start = time.monotonic()
+    (result,), _, usage = run([("s1", "sleep 30 & echo bg", 0.5)])
+    assert result.timed_out and result.stdout == "bg\n" and time.monotonic() - start < 5
+    assert usage["s1"].timeouts == 1
+
+def test_output_is_capped():
+    (result,), _, usage = run([("s1", "head -c 10000 /dev/zero", 5)], ExecutionLimits(max_output_bytes=1000))
+    assert len(result.stdout) == 1000 and result.truncated and result.output_bytes_dropped == 9000
+    assert usage["s1"].output_bytes_dropped == 9000
+
+def test_rlimits_and_nice_are_applied(tmp_path):
+    limits = ExecutionLimits(cpu_seconds=1, file_size_bytes=1000, nice=5)
+    (cpu, size, nice), _, _ = run([
+        ("s1", "while :; do :; done", 10),
+        ("s1", f"head -c 5000 /dev/zero > {tmp_path}/out.bin; echo $?", 5),
+        ("s1", "nice", 5),
+    ], limits)
+    assert not cpu.timed_out and cpu.returncode < 0 and cpu.cpu_time < 5  # SIGXCPU/SIGKILL
+    assert size.stdout.strip() != "0" and (tmp_path / "out.bin").stat().st_size == 1000
+    assert int(nice.stdout) == min(os.getpriority(os.PRIO_PROCESS, 0) + 5, 19)
+
+def test_sessions_share_a_worker_round_robin():
+    commands = [("flood", f"echo {index}", 5) for index in range(4)] + [("other", "echo other", 5)]
+    _, completed, usage = run(commands, max_workers=1)
+    assert [session_id for session_id, _ in completed] == ["flood", "other", "flood", "flood", "flood"]
+    assert usage["flood"].commands == 4 and usage["other"].commands == 1
+
+def test_processes_join_the_session_cgroup(tmp_path):
+    limits = ExecutionLimits(cgroup_root=str(tmp_path), cgroup_cpu_quota=0.5, cgroup_memory_bytes=1 << 30)
+    (result,), _, _ = run([("s1", "echo $$", 5)], limits)
+    cgroup_path = tmp_path / "session-s1"
+    assert (cgroup_path / "cpu.max").read_text() == "50000 100000"
+    assert (cgroup_path / "memory.max").read_text() == str(1 << 30)
+    assert (cgroup_path / "cgroup.procs").read_text() == result.stdout.strip()
@@ -0,0 +1,36 @@
+import asyncio
+
+from pandora.file_reader import FileReader, parse_specs
+
+def read(files:list, max_bytes:int):
+    return asyncio.run(FileReader().read(parse_specs(files), max_bytes))
+
+def test_ranged_read_leaves_its_budget_to_the_next_files(tmp_path):
+    big = tmp_path / "big.py"
+    big.write_text("".join(f"line {index} {'x' * 50}\n" for index in range(10_000)))
+    small = tmp_path / "small.py"
+    small.write_text("a = 1\nb = 2\n")
+
+    slices, missing = read([{"path": str(big), "start_line": 1, "end_line": 3}, str(small)], 200_000)
+    assert missing == []
+    assert (slices[0].start_line, slices[0].end_line, slices[0].truncated) == (1, 3, False)
+    assert slices[1].content == "a = 1\nb = 2\n" and not slices[1].truncated
+
+def test_budget_is_never_exceeded(tmp_path):
+    big = tmp_path / "big.py"
+    big.write_text("".join(f"line {index} {'x' * 50}\n" for index in range(10_000)))
+    files = [{"path": str(big), "start_line": 1, "end_line": 3}, str(big), {"path": str(big), "start_line": 500, "end_line": 520}]
+    for max_bytes in (0, 100, 1000, 50_000):
+        slices, _ = read(files, max_bytes)
+        assert sum(file_slice.size for file_slice in slices) <= max_bytes
+
+def test_globs_missing_and_binary_files(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("a\n")
+    (tmp_path / "pkg" / "b.py").write_text("b\n")
+    (tmp_path / "data.bin").write_bytes(b"\0\1\2")
+
+    slices, missing = read([str(tmp_path / "**" / "*.py"), str(tmp_path / "data.bin"), str(tmp_path / "nope*")], 1000)
+    assert [file_slice.content for file_slice in slices[:2]] == ["a\n", "b\n"]
+    assert slices[2].error == "binary file"
+    assert missing == [str(tmp_path / "nope*")]
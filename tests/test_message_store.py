@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from openai import APIStatusError, AsyncOpenAI
+
+from pandora.client_manager import ClientManager
+from pandora.message_store import MessageStore, StoredMessage
+from pandora.types import ChatMessage, Role
+
+HISTORY = [
+    ChatMessage(role=Role.USER, content='unicode é 漢字 🐍, quotes " and \\ backslashes'),
+    ChatMessage(role=Role.ASSISTANT, tool_calls=[{"id": "call_1", "type": "function", "function": {"name": "read_file", "arguments": '{"file_path": "a.py"}'}}]),
+    ChatMessage(role=Role.TOOL, tool_call_id="call_1", content="def f():\n    return 1\n"),
+]
+SSE_BODY = (
+    'data: {"id":"c","object":"chat.completion.chunk","created":0,"model":"gpt-4.1","choices":[{"index":0,"delta":{"content":"hel"},"finish_reason":null}]}\n\n'
+    'data: {"id":"c","object":"chat.completion.chunk","created":0,"model":"gpt-4.1","choices":[{"index":0,"delta":{"content":"lo"},"finish_reason":"stop"}]}\n\n'
+    "data: [DONE]\n\n"
+)
+
+def test_encode_matches_the_wire_form():
+    store = MessageStore(HISTORY)
+    system = StoredMessage(role=Role.SYSTEM, content="system")
+    assert json.loads(store.encode(system)) == [{"role": "system", "content": "system"}, *[message.model_dump(mode="json", exclude_none=True) for message in HISTORY]]
+    assert store.size == sum(len(message.encoded()) for message in store)
+    assert [message.to_chat_message() for message in store] == HISTORY
+    assert store[1].tool_calls[0]["id"] == "call_1" and store[2].tool_call_id == "call_1" and store[1].content is None
+
+def make_client_manager(handler) -> ClientManager:
+    client_manager = ClientManager("sk-test", max_retries=1, base_delay=0.0)
+    client_manager.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client_manager.openai_client = AsyncOpenAI(api_key="sk-test", http_client=client_manager.http_client, max_retries=0)
+    return client_manager
+
+def test_encoded_messages_are_posted_as_is():
+    requests = []
+
+    def handler(request:httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, content=SSE_BODY.encode(), headers={"content-type": "text/event-stream"})
+
+    async def main():
+        client_manager = make_client_manager(handler)
+        encoded = MessageStore(HISTORY).encode()
+        stream = await client_manager.create(model="gpt-4.1", encoded_messages=encoded, stream=True, max_tokens=16)
+        contents = [chunk.choices[0].delta.content async for chunk in stream]
+        return encoded, contents
+
+    encoded, contents = asyncio.run(main())
+    assert contents == ["hel", "lo"]
+    request = requests[0]
+    assert request.url.path.endswith("/chat/completions") and request.headers["authorization"] == "Bearer sk-test"
+    assert encoded in request.content  # the fragments are sent byte for byte
+    assert json.loads(request.content) == {"model": "gpt-4.1", "stream": True, "max_tokens": 16, "messages": json.loads(encoded)}
+
+def test_encoded_request_errors_are_sdk_errors_and_retried():
+    statuses = [503, 400]
+
+    def handler(request:httpx.Request) -> httpx.Response:
+        return httpx.Response(statuses.pop(0), json={"error": {"message": "nope"}})
+
+    async def main():
+        client_manager = make_client_manager(handler)
+        await client_manager.create(model="gpt-4.1", encoded_messages=b"[]", stream=True)
+
+    with pytest.raises(APIStatusError) as error:
+        asyncio.run(main())
+    assert error.value.status_code == 400 and statuses == []
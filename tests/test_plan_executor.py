@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import pytest
+
+from pandora.engine import Engine
+from pandora.file_reader import FileReader
+from pandora.plan_executor import PlanExecutor
+from pandora.types import Plan, PlanStep
+from pandora.workspace_index import WorkspaceIndex
+
+class StubChild:
+    def __init__(self, running:list):
+        self.running = running
+
+    async def run_task(self, task:str, max_turns:int=50) -> str:
+        self.running.append(task)
+        await asyncio.sleep(0.01)
+        peak = len(self.running)
+        self.running.remove(task)
+        return str(peak)
+
+class StubEngine(Engine):
+    def spawn_child(self) -> StubChild:
+        return StubChild(self.running)
+
+def make_plan(*steps:tuple) -> Plan:
+    return Plan(steps=[
+        PlanStep(id=step_id, title=step_id, description=step_id, priority="high", depends_on=list(depends_on))
+        for step_id, depends_on in steps
+    ])
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = StubEngine(
+        mcp_handler=None,
+        openai_api_key="sk-test",
+        file_reader=FileReader(),
+        workspace_index=WorkspaceIndex(str(tmp_path), index_dir=str(tmp_path / "index")),
+        max_plan_concurrency=2
+    )
+    engine.running = []
+    return engine
+
+@pytest.mark.parametrize("requested, expected_peak", [(0, 1), (-3, 1), (1, 1), (2, 2), (100, 2)])
+def test_execute_plan_clamps_max_concurrency(engine, requested, expected_peak):
+    engine.plans["plan_1"] = make_plan(("a", ()), ("b", ()), ("c", ()), ("d", ()))
+    result = json.loads(asyncio.run(asyncio.wait_for(engine.execute_plan("plan_1", max_concurrency=requested), timeout=5)))
+    assert [step["status"] for step in result["steps"]] == ["success"] * 4
+    assert max(int(step["result"]) for step in result["steps"]) == expected_peak
+
+def test_schema_advertises_the_configured_ceiling(engine):
+    engine.internal_state = 1
+    execute_plan = next(tool for tool in engine._build_tools(1, [])[0] if tool["function"]["name"] == "execute_plan")
+    assert execute_plan["function"]["parameters"]["properties"]["max_concurrency"]["maximum"] == 2
+    assert execute_plan["function"]["parameters"]["properties"]["max_concurrency"]["minimum"] == 1
+
+def test_failed_dependencies_skip_their_dependents(engine):
+    class FailingChild(StubChild):
+        async def run_task(self, task:str, max_turns:int=50) -> str:
+            if "STEP: a" in task:
+                raise RuntimeError("boom")
+            return await super().run_task(task, max_turns)
+    engine.spawn_child = lambda: FailingChild(engine.running)
+    results = asyncio.run(PlanExecutor(engine).run(make_plan(("a", ()), ("b", ("a",)), ("c", ()))))
+    assert [(result.id, result.status) for result in results] == [("a", "failed"), ("c", "success"), ("b", "skipped")]
+
+def test_invalid_plans_are_rejected(engine):
+    executor = PlanExecutor(engine)
+    with pytest.raises(ValueError, match="cycle"):
+        executor.topological_order(make_plan(("a", ("b",)), ("b", ("a",))))
+    with pytest.raises(ValueError, match="unknown"):
+        executor.topological_order(make_plan(("a", ("z",))))
+    with pytest.raises(ValueError):
+        PlanExecutor(engine, max_concurrency=0)
@@ -0,0 +1,36 @@
+import asyncio
+import io
+
+from pandora.renderer import ConsoleRenderer
+
+def render(events, **kwargs) -> str:
+    file = io.StringIO()
+
+    async def main():
+        async with ConsoleRenderer(file=file, **kwargs) as renderer:
+            for method, *args in events:
+                getattr(renderer, method)(*args)
+    asyncio.run(main())
+    return file.getvalue()
+
+def test_print_message_is_written_in_full_as_plain_text():
+    message = "line of the agent reply\n" * 300  # 7200 characters
+    output = render([
+        ("tool_call", "print_message", {"message": message, "message_type": "reply"}),
+        ("tool_result", "print_message", '{"message": "..."}'),
+    ], max_payload_size=2000)
+    assert message in output
+    assert output.count("line of the agent reply") == 300
+    assert "more characters" not in output and '"message"' not in output
+
+def test_other_payloads_are_truncated():
+    output = render([("tool_call", "create_file", {"file_path": "a.py", "content": "x" * 5000}), ("tool_result", "execute_bash", "y" * 5000)], max_payload_size=100)
+    assert "x" * 101 not in output and "y" * 101 not in output
+    assert output.count("more characters") == 2
+
+def test_print_message_is_never_dropped_under_lag():
+    events = [("tool_result", "execute_bash", f"result {index}") for index in range(50)]
+    events.append(("tool_call", "print_message", {"message": "still there", "message_type": "ask"}))
+    output = render(events, max_queue_size=4)
+    assert "still there" in output
+    assert "events dropped, output is lagging" in output
@@ -0,0 +1,46 @@
+import pytest
+
+from pandora.router import CallKind, ModelRouter, RoutingContext, RoutingHistory, RuleBasedPolicy
+
+FLAGSHIP, FAST = "gpt-4.1", "gpt-4.1-mini"
+
+def turn(**kwargs) -> RoutingContext:
+    context = {"call_kind": CallKind.TURN, "requested_model": FLAGSHIP, "internal_state": 1, "prompt_size": 1000, "last_tools": ["print_message"], "last_message_type": "notify"}
+    context.update(kwargs)
+    return RoutingContext(**context)
+
+@pytest.mark.parametrize("context, expected", [
+    (turn(), FAST),
+    (turn(last_message_type="update"), FAST),
+    (turn(last_tools=["print_message", "print_message"]), FAST),
+    (turn(internal_state=0), FLAGSHIP),  # interactive turns answer the user
+    (turn(prompt_size=50_000), FLAGSHIP),
+    (turn(last_tools=[]), FLAGSHIP),
+    (turn(last_message_type="think"), FLAGSHIP),
+    (turn(last_message_type="reply"), FLAGSHIP),
+    (turn(last_tools=["read_file"]), FLAGSHIP),  # the next turn usually writes what was read
+    (turn(last_tools=["read_files", "retrieve_context"]), FLAGSHIP),
+    (turn(last_tools=["create_file"]), FLAGSHIP),
+    (turn(last_tools=["print_message", "execute_bash"]), FLAGSHIP),
+    (turn(requested_model="o3"), "o3"),
+    (RoutingContext(call_kind=CallKind.EDIT_FILE, requested_model=FLAGSHIP, prompt_size=5_000), FAST),
+    (RoutingContext(call_kind=CallKind.EDIT_FILE, requested_model=FLAGSHIP, prompt_size=50_000), FLAGSHIP),
+    (RoutingContext(call_kind=CallKind.GENERATE_PLAN, requested_model=FLAGSHIP), FLAGSHIP),
+    (RoutingContext(call_kind=CallKind.SEARCH_THROUGH_WEB, requested_model="gpt-4o-mini-search-preview"), "gpt-4o-mini-search-preview"),
+])
+def test_policy_table(context, expected):
+    assert RuleBasedPolicy(flagship_model=FLAGSHIP, fast_model=FAST).select(context, RoutingHistory()) == expected
+
+@pytest.mark.parametrize("fast_model", [None, FLAGSHIP])
+def test_routing_is_opt_in(fast_model):
+    policy = RuleBasedPolicy(flagship_model=FLAGSHIP, fast_model=fast_model)
+    assert policy.select(turn(), RoutingHistory()) == FLAGSHIP
+    assert policy.select(RoutingContext(call_kind=CallKind.EDIT_FILE, requested_model=FLAGSHIP), RoutingHistory()) == FLAGSHIP
+
+def test_failing_fast_model_falls_back_to_the_flagship():
+    router = ModelRouter(RuleBasedPolicy(flagship_model=FLAGSHIP, fast_model=FAST))
+    assert router.route(turn()) == FAST
+    for success in [True, False, False, True, False]:
+        router.record(CallKind.TURN, FAST, success)
+    assert router.route(turn()) == FLAGSHIP
+    assert router.route(RoutingContext(call_kind=CallKind.EDIT_FILE, requested_model=FLAGSHIP)) == FAST  # tracked per call kind
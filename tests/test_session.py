@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+from openai.types.chat.chat_completion_chunk import ChoiceDeltaToolCall
+
+from pandora.engine import Engine
+from pandora.file_reader import FileReader
+from pandora.renderer import Renderer
+from pandora.session import SessionStore
+from pandora.types import ChatMessage, FinishReason, Role
+from pandora.workspace_index import WorkspaceIndex
+
+class StubMCPHandler:
+    def get_tools(self) -> list:
+        return []
+
+def make_engine(tmp_path, session_store:SessionStore) -> Engine:
+    return Engine(
+        mcp_handler=StubMCPHandler(),
+        openai_api_key="sk-test",
+        session_store=session_store,
+        renderer=Renderer(),
+        file_reader=FileReader(),
+        workspace_index=WorkspaceIndex(str(tmp_path), index_dir=str(tmp_path / "index"))
+    )
+
+def user(content:str) -> ChatMessage:
+    return ChatMessage(role=Role.USER, content=content)
+
+def test_resume_restores_messages_and_state(tmp_path):
+    with SessionStore(str(tmp_path), session_id="s1", checkpoint_every=2) as store:
+        store.extend([user("a"), user("b"), user("c")], internal_state=1)
+    with SessionStore(str(tmp_path), session_id="s1") as store:
+        assert [message.content for message in store.messages] == ["a", "b", "c"]
+        assert store.internal_state == 1 and store.seq == 3
+        assert store.last_checkpoint_seq == 3
+
+def test_torn_record_is_dropped(tmp_path):
+    with SessionStore(str(tmp_path), session_id="s1") as store:
+        store.extend([user("a"), user("b")], internal_state=0)
+    log_path = tmp_path / "s1.jsonl"
+    with open(log_path, "ab") as file_pointer:
+        file_pointer.write(b'{"seq":2,"internal_state":0,"message":{"role":"us')
+    with SessionStore(str(tmp_path), session_id="s1") as store:
+        assert [message.content for message in store.messages] == ["a", "b"]
+        store.append(user("c"), internal_state=0)
+    with SessionStore(str(tmp_path), session_id="s1") as store:
+        assert [message.content for message in store.messages] == ["a", "b", "c"]
+
+def test_fork_copies_the_whole_log_or_up_to_seq(tmp_path):
+    with SessionStore(str(tmp_path), session_id="source", checkpoint_every=2) as store:
+        store.extend([user(str(index)) for index in range(5)], internal_state=0)
+    with SessionStore.fork(str(tmp_path), "source", session_id="whole") as forked:
+        assert [message.content for message in forked.messages] == ["0", "1", "2", "3", "4"]
+    with SessionStore.fork(str(tmp_path), "source", 3, session_id="partial") as forked:
+        assert [message.content for message in forked.messages] == ["0", "1", "2"]
+        forked.append(user("new"), internal_state=0)
+    with SessionStore(str(tmp_path), session_id="source") as store:
+        assert len(store.messages) == 5
+
+def test_assistant_turn_is_persisted_before_its_tools_finish(tmp_path):
+    started = asyncio.Event()
+
+    async def main():
+        with SessionStore(str(tmp_path), session_id="s1") as store:
+            engine = make_engine(tmp_path, store)
+            _, messages = engine.restore_session()
+            engine.internal_state = 1
+            engine.record_messages(messages, [user("run the tests")])
+
+            async def execute_bash(command:str, timeout:int=10) -> str:
+                started.set()
+                await asyncio.sleep(3600)
+            engine.execute_bash = execute_bash
+            tools_hmap = {
+                0: ChoiceDeltaToolCall(index=0, id="call_1", type="function", function={"name": "read_file", "arguments": json.dumps({"file_path": str(tmp_path / "missing")})}),
+                1: ChoiceDeltaToolCall(index=1, id="call_2", type="function", function={"name": "execute_bash", "arguments": json.dumps({"command": "pytest"})}),
+            }
+            turn = asyncio.create_task(engine.handle_assistant_response(messages, FinishReason.TOOL_CALLS, "", tools_hmap))
+            await started.wait()
+            await asyncio.sleep(0.01)
+            turn.cancel()  # the process dies while execute_bash runs
+            await asyncio.gather(turn, return_exceptions=True)
+    asyncio.run(main())
+
+    with SessionStore(str(tmp_path), session_id="s1") as store:
+        engine = make_engine(tmp_path, store)
+        finish_reason, messages = engine.restore_session()
+        assert finish_reason == FinishReason.TOOL_CALLS  # resumes after the model call
+        assert [message.role for message in messages] == [Role.USER, Role.ASSISTANT, Role.TOOL, Role.TOOL]
+        results = {message.tool_call_id: message.content for message in messages if message.role == Role.TOOL}
+        assert results["call_1"].startswith("Error:") and "missing" in results["call_1"]
+        assert results["call_2"] == "Error: tool call interrupted by a restart"
+
+def test_exit_query_is_not_recorded(tmp_path, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda prompt: "exit")
+    with SessionStore(str(tmp_path), session_id="s1") as store:
+        asyncio.run(make_engine(tmp_path, store).loop())
+    with SessionStore(str(tmp_path), session_id="s1") as store:
+        assert len(store.messages) == 0
@@ -0,0 +1,98 @@
+import json
+import os
+import random
+import stat
+
+import pytest
+
+from pandora.streaming import IncrementalJSONDecodeError, IncrementalJSONStringDecoder, StreamingFileWriter
+
+SAMPLES = [
+    "",
+    "plain text",
+    "line 1\nline 2\ttabbed\r\n",
+    'quotes " and backslashes \\ and slashes /',
+    "unicode é ü 漢字 and emoji 🐍🚀",
+    "control \b\f\x00\x1f characters",
+    "def main():\n    print(\"hello\")\n" * 200,
+]
+
+def split(text:str, rng:random.Random) -> list:
+    chunks, index = [], 0
+    while index < len(text):
+        size = rng.randint(1, 7)
+        chunks.append(text[index:index + size])
+        index += size
+    return chunks
+
+@pytest.mark.parametrize("content", SAMPLES)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_split_chunk_round_trip(content:str, ensure_ascii:bool):
+    arguments = json.dumps({"file_path": "out/f.py", "content": content}, ensure_ascii=ensure_ascii)
+    rng = random.Random(len(content))
+    for _ in range(20):
+        decoder = IncrementalJSONStringDecoder()
+        streamed = "".join(decoder.feed(chunk) for chunk in split(arguments, rng))
+        assert streamed == json.loads(arguments)["content"]
+        assert decoder.values["file_path"] == "out/f.py"
+        assert decoder.completed and decoder.stream_completed
+
+def test_content_before_file_path():
+    arguments = json.dumps({"content": "a\nb", "file_path": "x.txt"})
+    decoder = IncrementalJSONStringDecoder()
+    assert "".join(decoder.feed(char) for char in arguments) == "a\nb"
+    assert decoder.values["file_path"] == "x.txt"
+
+def test_malformed_arguments():
+    decoder = IncrementalJSONStringDecoder()
+    with pytest.raises(IncrementalJSONDecodeError):
+        decoder.feed('{"content": "a", 42}')
+
+def feed_all(writer:StreamingFileWriter, arguments:str) -> None:
+    for chunk in split(arguments, random.Random(0)):
+        writer.feed(chunk)
+
+def temp_files(directory) -> list:
+    return [name for name in os.listdir(directory) if name.startswith(".pandora-")]
+
+def test_commit_writes_the_file_with_the_default_mode(tmp_path):
+    file_path = str(tmp_path / "out" / "f.sh")
+    content = "echo 'streamed'\n" * 50
+    writer = StreamingFileWriter()
+    feed_all(writer, json.dumps({"file_path": file_path, "content": content}))
+    assert writer.commit(file_path, len(content))
+    with open(file_path) as file_pointer:
+        assert file_pointer.read() == content
+
+    reference = tmp_path / "reference"
+    reference.write_text("")
+    assert stat.S_IMODE(os.stat(file_path).st_mode) == stat.S_IMODE(os.stat(reference).st_mode)
+    assert temp_files(tmp_path / "out") == []
+
+def test_commit_keeps_the_mode_of_the_replaced_file(tmp_path):
+    file_path = tmp_path / "run.sh"
+    file_path.write_text("old")
+    os.chmod(file_path, 0o750)
+    writer = StreamingFileWriter()
+    feed_all(writer, json.dumps({"file_path": str(file_path), "content": "new"}))
+    assert writer.commit(str(file_path), 3)
+    assert file_path.read_text() == "new"
+    assert stat.S_IMODE(os.stat(file_path).st_mode) == 0o750
+
+def test_abort_removes_the_temp_file_and_creates_no_directory(tmp_path):
+    file_path = str(tmp_path / "missing" / "f.py")
+    writer = StreamingFileWriter()
+    feed_all(writer, json.dumps({"file_path": file_path, "content": "x" * 1000})[:-10])  # truncated stream
+    assert writer.tmp_path is not None
+    tmp_path_before_abort = writer.tmp_path
+    writer.abort()
+    assert not os.path.exists(tmp_path_before_abort)
+    assert not os.path.exists(tmp_path / "missing")
+
+def test_commit_rejects_a_length_mismatch(tmp_path):
+    file_path = str(tmp_path / "f.txt")
+    writer = StreamingFileWriter()
+    feed_all(writer, json.dumps({"file_path": file_path, "content": "abc"}))
+    assert not writer.commit(file_path, 4)
+    assert not os.path.exists(file_path)
+    assert temp_files(tmp_path) == []
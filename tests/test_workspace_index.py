@@ -0,0 +1,28 @@
+import pytest
+
+from pandora.workspace_index import ArrayVectorStore, MemmapVectorStore, WorkspaceIndex
+
+@pytest.mark.parametrize("store_class", [MemmapVectorStore, ArrayVectorStore])
+def test_incremental_updates(tmp_path, store_class):
+    workspace, index_dir = tmp_path / "workspace", tmp_path / "index"
+    workspace.mkdir()
+    (workspace / "config.py").write_text("def parse_config(path):\n    return load_yaml(path)\n" * 30)
+    (workspace / "server.py").write_text("class HttpServer:\n    def serve_forever(self): pass\n" * 30)
+
+    index = WorkspaceIndex(str(workspace), index_dir=str(index_dir), store_class=store_class)
+    assert index.refresh(force=True) == 2
+    assert index.search("http server")[0].path == "server.py"
+
+    (workspace / "server.py").unlink()
+    with open(workspace / "config.py", "a") as file_pointer:
+        file_pointer.write("# edited\n")
+    assert index.refresh(force=True) == 2
+    assert [snippet.path for snippet in index.search("http server")] == []
+    assert {snippet.path for snippet in index.search("parse config yaml")} == {"config.py"}
+
+    # a new process reuses the stored vectors and only embeds the new file
+    (workspace / "handler.py").write_text("def serve_http(request):\n    pass\n")
+    reloaded = WorkspaceIndex(str(workspace), index_dir=str(index_dir), store_class=store_class)
+    assert reloaded.refresh(force=True) == 1
+    assert reloaded.search("serve http")[0].path == "handler.py"
+    assert reloaded.embedder.documents == len(reloaded.chunks) - len(reloaded.free_rows)